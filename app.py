@@ -1,215 +1,269 @@
-import pandas as pd
+import argparse
 import os
 import sys
 
+from cube import DEFAULT_SLA_DAYS, CubeSpill, default_cube_path
+from audit_join import DUPLICATE_POLICIES
+from history import HistoryWriter, default_history_path
+from ingest_cache import read_excel_cached
+from instrument import PROFILERS, RunInstrumentation
+from mappings import DEFAULT_MAPPINGS_FILE, load_mappings
+from pipeline import (find_file, find_files, finish_run, load_audit, place_product_name, prepare_inputs,
+                      prepare_audit, print_join_stats, reconcile, write_cube, write_exceptions, write_history,
+                      write_lookup_store)
+from rules import PROFILES, computed_columns
+from validate import CHECK_NAMES, Validator, default_exceptions_path
+from writers import open_sink, select_columns, write_output
+
 # Folder path
 folder = r"C:\Users\Admin\Documents\CKYC Python"
 
-# 🔍 Dynamically detect files
-def find_file(keyword):
-    for f in os.listdir(folder):
-        if keyword.lower() in f.lower() and f.lower().endswith('.xlsx'):
-            return os.path.join(folder, f)
-    return None
-
-# File detection
-base_file = find_file("CKYC BASE DATA")
-audit_file = find_file("Custom_audit_report")
-
-if not base_file:
-    sys.exit("❌ Error: 'CKYC BASE DATA.xlsx' not found in folder.")
-if not audit_file:
-    sys.exit("❌ Error: 'Custom_audit_report.xlsx' not found in folder.")
-
-# Load Excel files
-try:
-    base_df = pd.read_excel(base_file)
-    audit_df = pd.read_excel(audit_file)
-except Exception as e:
-    sys.exit(f"❌ Error reading Excel files: {str(e)}")
-
-# Clean columns and strings
-base_df.columns = base_df.columns.str.strip()
-audit_df.columns = audit_df.columns.str.strip()
-audit_df = audit_df.map(lambda x: x.strip() if isinstance(x, str) else x)
-
-# ----------------------------------------------------------------------------
-# Approved/Disbursed Date
-# ----------------------------------------------------------------------------
-date_cols = ["App Form DisbursalDate", "Appform Approval Date", "Recent Status Date"]
-for col in date_cols:
-    if col in base_df.columns:
-        base_df[col] = pd.to_datetime(base_df[col], errors='coerce').dt.date
-
-def get_disbursed_date(row):
-    for col in date_cols:
-        if pd.notna(row.get(col)):
-            return row[col]
-    return pd.NaT
-
-base_df["Approved/Disbursed Date"] = base_df.apply(get_disbursed_date, axis=1)
-
-# ----------------------------------------------------------------------------
-# Month Column
-# ----------------------------------------------------------------------------
-base_df["Month"] = pd.to_datetime(base_df["Approved/Disbursed Date"], errors='coerce').dt.strftime("%b'%y")
-
-# ----------------------------------------------------------------------------
-# Applicant ID mapping
-# ----------------------------------------------------------------------------
-if "Los App Id" in audit_df.columns:
-    audit_df["Applicant_id"] = audit_df["Los App Id"].astype(str).str.extract(r'_(\d+)$')[0].str.strip()
-
-base_df["Applicant_id"] = base_df["Applicant_id"].astype(str).str.strip()
-audit_df["Applicant_id"] = audit_df["Applicant_id"].astype(str).str.strip()
-
-# ----------------------------------------------------------------------------
-# Workflow Mapping from Status
-# ----------------------------------------------------------------------------
-if "Status" in audit_df.columns:
-    workflow_map = audit_df.set_index("Applicant_id")["Status"].to_dict()
-    base_df["Workflow"] = base_df["Applicant_id"].map(workflow_map)
-
-# ----------------------------------------------------------------------------
-# CKYC Status from Workflow
-# ----------------------------------------------------------------------------
-workflow_status_map = {
-    "Auto resolution": [
-        "download_auth_failed_notify", "download_initiated", "download_processing_pending",
-        "download_submitted", "download_uploaded", "failed_timer_pending", "initiated",
-        "operation_decision_failed", "probable_match_submitted", "submitted", "triggered"
-    ],
-    "CKYC Completed": ["ckyc_number_updated"],
-    "Under Resolution with Ops": [
-        "download_auth_failed", "manual_review", "post_processing_download_auth_failed",
-        "search_and_download_validation_failed"
-    ],
-    "Pending with CKYC Team": ["probable_match_uploaded", "processed_awaiting_response", "uploaded"],
-    "Issue with CKYC": ["download_auth_failed_notified"],
-    "Manually Reported by Ops": ["Manually Reported by Ops"],
-    "CKYC Upload Pending": ["CKYC Upload Pending"]
-}
-
-def map_ckyc_status(workflow):
-    for status, workflows in workflow_status_map.items():
-        if str(workflow).strip() in workflows:
-            return status
-    return ""
-
-base_df["CKYC Status"] = base_df["Workflow"].apply(map_ckyc_status)
-
-# ----------------------------------------------------------------------------
-# Final Status
-# ----------------------------------------------------------------------------
-completed_keywords = ["ckyc completed", "ckyc completed - manual", "issue with ckyc", "manually reported by ops", "under resolution with ops"]
-pending_keywords = ["auto resolution", "ckyc upload pending", "pending with ckyc team"]
-
-def determine_final_status(status1):
-    if pd.isna(status1):
-        return ""
-    status_lower = str(status1).strip().lower()
-    if status_lower in completed_keywords:
-        return "Completed"
-    elif status_lower in pending_keywords:
-        return "Pending"
-    return ""
-
-base_df["Final Status"] = base_df["CKYC Status"].apply(determine_final_status)
-
-# ----------------------------------------------------------------------------
-# InwardDate Mapping
-# ----------------------------------------------------------------------------
-if "Triggered Date" in audit_df.columns:
-    triggered_date_map = audit_df.set_index("Applicant_id")["Triggered Date"].to_dict()
-    base_df["InwardDate"] = pd.to_datetime(base_df["Applicant_id"].map(triggered_date_map), errors='coerce').dt.date
-
-# ----------------------------------------------------------------------------
-# Completion Date
-# ----------------------------------------------------------------------------
-if "CKYC Completion Date" in audit_df.columns:
-    completion_map = audit_df.set_index("Applicant_id")["CKYC Completion Date"].to_dict()
-    base_df["Completion Date"] = pd.to_datetime(base_df["Applicant_id"].map(completion_map), errors='coerce').dt.date
-
-# ----------------------------------------------------------------------------
-# CKYC Number
-# ----------------------------------------------------------------------------
-if "CKYC Number" in audit_df.columns:
-    number_map = audit_df.set_index("Applicant_id")["CKYC Number"].to_dict()
-    base_df["CKYC Number"] = base_df["Applicant_id"].map(number_map)
-
-# ----------------------------------------------------------------------------
-# CKYC Upload Date
-# ----------------------------------------------------------------------------
-if "First Batch Upload Date" in audit_df.columns:
-    upload_map = audit_df.set_index("Applicant_id")["First Batch Upload Date"].to_dict()
-    base_df["CKYC Upload Date"] = pd.to_datetime(base_df["Applicant_id"].map(upload_map), errors='coerce').dt.date
-
-# ----------------------------------------------------------------------------
-# CKYC Reporting TAT = CKYC Upload Date - Disbursed Date
-# ----------------------------------------------------------------------------
-base_df["CKYC Reporting TAT"] = (
-    pd.to_datetime(base_df["CKYC Upload Date"], errors='coerce') -
-    pd.to_datetime(base_df["Approved/Disbursed Date"], errors='coerce')
-).dt.days
-
-# ----------------------------------------------------------------------------
-# CKYC Trigger TAT = InwardDate - Disbursed Date
-# ----------------------------------------------------------------------------
-base_df["CKYC Trigger TAT"] = (
-    pd.to_datetime(base_df["InwardDate"], errors='coerce') -
-    pd.to_datetime(base_df["Approved/Disbursed Date"], errors='coerce')
-).dt.days
-
-# ----------------------------------------------------------------------------
-# CKYC ID Length
-# ----------------------------------------------------------------------------
-base_df["CKYC ID Length"] = base_df["CKYC Number"].apply(lambda x: len(str(x)) if pd.notna(x) else "")
-
-# ----------------------------------------------------------------------------
-# Product Name Mapping (insert after "Partner Id")
-# ----------------------------------------------------------------------------
-product_map = {
-    "SEP": "SEP",
-    "AIR": "Embedded Finance", "ANG": "Embedded Finance", "CLP": "Embedded Finance", "ETC": "Embedded Finance",
-    "GRO": "Embedded Finance", "INC": "Embedded Finance", "JAR": "Embedded Finance", "NBR": "Embedded Finance",
-    "NRO": "Embedded Finance", "OLA": "Embedded Finance", "ONL": "Embedded Finance", "PEL": "Embedded Finance",
-    "SPM": "Embedded Finance",
-    "LAP": "LAP", "LPA": "LAP", "LPD": "LAP", "HLD": "LAP", "PLP": "LAP",
-    "PCL": "Fintech Partnership", "AVN": "Fintech Partnership", "BPT": "Fintech Partnership", "CRC": "Fintech Partnership",
-    "ESC": "Fintech Partnership", "JPT": "Fintech Partnership", "KBL": "Fintech Partnership", "MTC": "Fintech Partnership",
-    "MVL": "Fintech Partnership", "PRL": "Fintech Partnership", "PSE": "Fintech Partnership", "UNC": "Fintech Partnership",
-    "ZM": "Fintech Partnership",
-    "SBA": "SBL", "SBD": "SBL", "SBL": "SBL",
-    "UBL": "UBL", "UPL": "UPL", "NVI": "NVI", "LKB": "LKB", "AFB": "AFB", "WSL": "WSL"
-}
-
-base_df["Product Name"] = base_df["Loan Product"].map(product_map)
-
-# Move 'Product Name' next to 'Partner Id'
-if "Partner Id" in base_df.columns:
-    cols = list(base_df.columns)
-    idx = cols.index("Partner Id") + 1
-    cols.insert(idx, cols.pop(cols.index("Product Name")))
-    base_df = base_df[cols]
-
-# ----------------------------------------------------------------------------
-# Save updated Excel
-# ----------------------------------------------------------------------------
-try:
-    base_df.to_excel(base_file, index=False)
-    print("\n✅ CKYC BASE DATA.xlsx updated with:")
-    print(" - Approved/Disbursed Date")
-    print(" - Month")
-    print(" - Workflow")
-    print(" - CKYC Status")
-    print(" - Final Status")
-    print(" - InwardDate")
-    print(" - Completion Date")
-    print(" - CKYC Number")
-    print(" - CKYC Upload Date")
-    print(" - CKYC Reporting TAT")
-    print(" - CKYC Trigger TAT")
-    print(" - CKYC ID Length")
-    print(" - Product Name")
-except Exception as e:
-    print(f"❌ Failed to save Excel file: {str(e)}")
+def main(argv=None):
+    global folder
+
+    parser = argparse.ArgumentParser(description="CKYC base data reconciliation")
+    parser.add_argument("--folder", default=folder, help="Folder holding the input workbooks")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="Re-parse the Excel inputs and refresh the Parquet ingest cache")
+    parser.add_argument("--audit-workers", type=int, default=None,
+                        help="Processes used to parse several audit reports (default: one per CPU core)")
+    parser.add_argument("--duplicate-policy", choices=DUPLICATE_POLICIES, default="last",
+                        help="Audit row to keep per Applicant_id: first, last, or latest by Triggered Date")
+    parser.add_argument("--mappings", default=DEFAULT_MAPPINGS_FILE,
+                        help="Versioned JSON file with the workflow, final status and product mappings")
+    parser.add_argument("--rules", choices=list(PROFILES), default="app",
+                        help="Column rule profile to apply: app, or the legacy oldapp/test variants")
+    parser.add_argument("--columns", nargs="+", default=None,
+                        help="Compute only these derived columns (plus what they depend on), e.g. 'Final Status'")
+    parser.add_argument("--backend", choices=["pandas", "polars"], default="pandas",
+                        help="Engine for clean + reconcile; polars runs one multithreaded lazy plan (app profile only)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Recompute only applicants whose base or audit rows changed since the last run")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the saved incremental state and TAT cube months, rebuild everything and refresh them")
+    parser.add_argument("--verify", action="store_true",
+                        help="With --incremental: also run a full rebuild and check both outputs match")
+    parser.add_argument("--state", default=None,
+                        help="Incremental state file (default: .ckyc_cache/incremental_state.parquet in the folder)")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Stream the base data in chunks of this many rows (bounds peak memory)")
+    parser.add_argument("--output", default=None,
+                        help="Output file, .xlsx/.parquet/.csv (default: overwrite the base workbook, so its "
+                             "ingest cache is stale on the next run; with --chunk-size a .parquet next to it)")
+    parser.add_argument("--output-columns", choices=["all", "derived"], default="all",
+                        help="Write every column, or only Applicant_id plus the derived columns")
+    parser.add_argument("--cube", default=None,
+                        help="TAT summary cube file, .parquet/.csv/.xlsx (default: ckyc_tat_cube.parquet in the folder)")
+    parser.add_argument("--no-cube", action="store_true", help="Skip the TAT summary cube")
+    parser.add_argument("--sla-days", type=int, nargs="+", default=list(DEFAULT_SLA_DAYS),
+                        help="Ascending SLA thresholds in days for the cube's TAT buckets")
+    parser.add_argument("--exceptions", default=None,
+                        help="Data-quality exceptions report (.csv/.parquet/.xlsx, default: ckyc_exceptions.csv in --folder)")
+    parser.add_argument("--no-validate", action="store_true", help="Skip the data-quality checks")
+    parser.add_argument("--fail-on", choices=CHECK_NAMES, nargs="*", default=None,
+                        help="Fail the run, without saving the workbook, if these checks (none listed: any check) find rows")
+    parser.add_argument("--history", default=None,
+                        help="Run history store directory (default: ckyc_history in --folder)")
+    parser.add_argument("--no-history", action="store_true", help="Do not append this run to the history store")
+    parser.add_argument("--lookup-store", default=None,
+                        help="Also build a memory-mapped lookup store (directory) for lookup.py queries")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running: re-apply audit reports as they land in the folder, with the base data "
+                             "and audit index kept in memory")
+    parser.add_argument("--poll-interval", type=float, default=2.0,
+                        help="With --watch: seconds between folder checks")
+    parser.add_argument("--settle-seconds", type=float, default=2.0,
+                        help="With --watch: a file must stop changing for this long before it is read")
+    parser.add_argument("--run-log", default=None,
+                        help="JSON-lines file that gets one timing record per run (default: ckyc_run_log.jsonl in the folder)")
+    parser.add_argument("--track-memory", action="store_true",
+                        help="Measure per-stage peak memory with tracemalloc (slows the run down several times)")
+    parser.add_argument("--profile-stage", default=None,
+                        help="Profile one named stage, e.g. 'audit join' or 'save'")
+    parser.add_argument("--profiler", choices=PROFILERS, default="cprofile",
+                        help="Profiler used for --profile-stage")
+    args = parser.parse_args(argv)
+    folder = args.folder
+    # Folder-relative defaults, resolved once for every mode
+    args.cube = args.cube or default_cube_path(folder)
+    args.exceptions = args.exceptions or default_exceptions_path(folder)
+    args.history = args.history or default_history_path(folder)
+
+    if args.chunk_size is not None and (args.chunk_size <= 0 or args.incremental):
+        parser.error("--chunk-size must be positive and cannot be combined with --incremental")
+    if (args.rules != "app" or args.columns) and (args.incremental or args.watch):
+        parser.error("--rules and --columns cannot be combined with --incremental or --watch")
+    try:
+        outputs = computed_columns(args.rules, args.columns)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.backend == "polars" and (args.rules != "app" or args.columns or args.incremental or args.watch
+                                     or args.chunk_size is not None):
+        parser.error("--backend polars runs the full app profile in batch mode only")
+    if args.watch and (args.chunk_size is not None or args.incremental):
+        parser.error("--watch cannot be combined with --chunk-size or --incremental")
+    if not args.sla_days or sorted(set(args.sla_days)) != args.sla_days or args.sla_days[0] < 0:
+        parser.error("--sla-days must be non-negative and strictly ascending")
+    if args.no_validate and args.fail_on is not None:
+        parser.error("--fail-on cannot be combined with --no-validate")
+    if args.watch and args.fail_on is not None:
+        parser.error("--fail-on cannot be combined with --watch: a refresh has no run to fail")
+    if not args.no_history and (args.rules != "app" or args.columns):
+        # Trends compare full app-profile snapshots; partial runs would mix in rows without TATs
+        print("ℹ️ History not updated: only full --rules app runs (no --columns) are archived")
+        args.no_history = True
+
+    # Mapping tables are compiled once into inverted lookups
+    try:
+        mappings = load_mappings(args.mappings)
+    except (OSError, ValueError) as e:
+        sys.exit(f"❌ Error loading mappings: {str(e)}")
+
+    run = RunInstrumentation(memory=args.track_memory, profile_stage=args.profile_stage,
+                             profiler=args.profiler)
+    run_log = args.run_log or os.path.join(folder, "ckyc_run_log.jsonl")
+
+    # File detection
+    base_file = find_file("CKYC BASE DATA", folder)
+    audit_files = find_files("Custom_audit_report", folder)
+
+    if not base_file:
+        sys.exit("❌ Error: 'CKYC BASE DATA.xlsx' not found in folder.")
+
+    if args.watch:
+        from watch import run_watch
+
+        run.close()
+        run_watch(folder, base_file, mappings, args, run_log)
+        return
+
+    if not audit_files:
+        sys.exit("❌ Error: 'Custom_audit_report.xlsx' not found in folder.")
+    if len(audit_files) > 1:
+        print(f"📥 {len(audit_files)} audit reports: " + ", ".join(os.path.basename(f) for f in audit_files))
+
+    if args.chunk_size:
+        from chunked import run_chunked
+
+        output_path = args.output or os.path.splitext(base_file)[0] + ".parquet"
+        # Cube and checks see every chunk as it streams by
+        spill = validator = None
+        try:
+            if not args.no_cube:
+                spill = CubeSpill(args.cube)
+            if not args.no_validate:
+                validator = Validator(mappings, sink=open_sink(args.exceptions), computed=outputs)
+        except ValueError as e:
+            sys.exit(f"❌ {str(e)}")
+        observers = [o for o in (spill, validator) if o is not None]
+        history = None
+        if not args.no_history:
+            history = HistoryWriter(args.history)
+        try:
+            with run.stage("load") as stage:
+                audit_df = load_audit(audit_files, args.audit_workers, args.rebuild_cache)
+                stage.rows_out = len(audit_df)
+            with run.stage("clean", len(audit_df)):
+                audit_df = prepare_audit(audit_df)
+            join_stats = run_chunked(base_file, audit_df, mappings, output_path,
+                                     chunk_size=args.chunk_size, duplicate_policy=args.duplicate_policy,
+                                     output_columns=args.output_columns, observers=observers,
+                                     profile=args.rules, targets=args.columns, history=history, run=run)
+        except (OSError, ValueError) as e:
+            if history is not None:
+                history.discard()
+            if spill is not None:
+                spill.discard()
+            if validator is not None:
+                validator.close(commit=False)
+            sys.exit(f"❌ Chunked run failed: {str(e)}")
+        print_join_stats(join_stats)
+        print(f"\n✅ {join_stats['base_rows']} rows written to {output_path}")
+        if spill is not None:
+            write_cube(None, args, run, spill=spill)
+        failed = [] if validator is None else write_exceptions(None, mappings, args, run, validator=validator)
+        if history is not None:
+            write_history(None, args, outputs, run, writer=history)
+        finish_run(run, run_log)
+        if failed:
+            # Chunks are already written by now; only the exit status can flag the run
+            sys.exit(f"❌ Data-quality checks failed: {', '.join(failed)}")
+        return
+
+    # Load Excel files (parsed once, then served from the Parquet cache until changed)
+    try:
+        with run.stage("load") as stage:
+            base_df = read_excel_cached(base_file, rebuild=args.rebuild_cache)
+            audit_df = load_audit(audit_files, args.audit_workers, args.rebuild_cache)
+            stage.rows_out = len(base_df) + len(audit_df)
+    except Exception as e:
+        sys.exit(f"❌ Error reading Excel files: {str(e)}")
+
+    if args.backend == "polars":
+        from polars_backend import reconcile_polars
+
+        # Cleaning happens inside the Polars plan
+        try:
+            base_df, join_stats = reconcile_polars(base_df, audit_df, mappings, args.duplicate_policy, run=run)
+        except ValueError as e:
+            sys.exit(f"❌ {str(e)}")
+    elif args.incremental:
+        from incremental import default_state_path, run_incremental
+
+        with run.stage("clean", len(base_df) + len(audit_df)):
+            base_df, audit_df = prepare_inputs(base_df, audit_df)
+        state_path = args.state or default_state_path(folder)
+        try:
+            base_df, join_stats = run_incremental(base_df, audit_df, mappings, state_path,
+                                                  duplicate_policy=args.duplicate_policy,
+                                                  full=args.full, verify=args.verify, run=run)
+        except (RuntimeError, ValueError) as e:
+            sys.exit(f"❌ {str(e)}")
+    else:
+        with run.stage("clean", len(base_df) + len(audit_df)):
+            base_df, audit_df = prepare_inputs(base_df, audit_df)
+        try:
+            base_df, join_stats = reconcile(base_df, audit_df, mappings, args.duplicate_policy, run=run,
+                                            profile=args.rules, targets=args.columns)
+        except ValueError as e:
+            sys.exit(f"❌ {str(e)}")
+    if join_stats:
+        print_join_stats(join_stats)
+
+    if not args.no_validate:
+        failed = write_exceptions(base_df, mappings, args, run)
+        if failed:
+            finish_run(run, run_log)
+            sys.exit(f"❌ Data-quality checks failed: {', '.join(failed)} - "
+                     f"{os.path.basename(args.output or base_file)} was not written")
+
+    base_df = place_product_name(base_df)
+
+    # ----------------------------------------------------------------------------
+    # Save: temp file + atomic rename, so a crash never corrupts the workbook
+    # ----------------------------------------------------------------------------
+    output_path = args.output or base_file
+    try:
+        with run.stage("save", len(base_df)):
+            write_output(select_columns(base_df, args.output_columns, outputs), output_path)
+        print(f"\n✅ {os.path.basename(output_path)} updated with:")
+        for col in outputs:
+            print(f" - {col}")
+    except Exception as e:
+        # Lookup store, cube and history must not publish a run whose output never landed
+        finish_run(run, run_log)
+        sys.exit(f"❌ Failed to save output file: {str(e)}")
+
+    if args.lookup_store:
+        write_lookup_store(base_df, args.lookup_store, run)
+
+    if not args.no_cube:
+        write_cube(base_df, args, run)
+
+    if not args.no_history:
+        write_history(base_df, args, outputs, run)
+
+    finish_run(run, run_log)
+
+if __name__ == "__main__":
+    main()
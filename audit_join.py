@@ -0,0 +1,106 @@
+import pandas as pd
+
+# What to keep when the audit report has several rows for one Applicant_id
+DUPLICATE_POLICIES = ("first", "last", "latest")
+
+# ----------------------------------------------------------------------------
+# Duplicate Applicant_id handling
+# ----------------------------------------------------------------------------
+def dedupe_audit(audit_df, key="Applicant_id", policy="last", date_col="Triggered Date"):
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"Unknown duplicate policy '{policy}', expected one of {DUPLICATE_POLICIES}")
+
+    if policy == "latest" and date_col in audit_df.columns:
+        # Stable sort keeps file order among equal dates; undated rows sort first so any dated row wins
+        order = pd.to_datetime(audit_df[date_col], errors='coerce').rename("_order")
+        audit_df = audit_df.join(order).sort_values("_order", kind="stable", na_position="first")
+        return audit_df.drop(columns="_order").drop_duplicates(subset=key, keep="last")
+
+    # "latest" without a date column falls back to the old last-wins behaviour
+    keep = "first" if policy == "first" else "last"
+    return audit_df.drop_duplicates(subset=key, keep=keep)
+
+# ----------------------------------------------------------------------------
+# Audit index: deduplicated audit columns keyed by Applicant_id, built once
+# ----------------------------------------------------------------------------
+def build_audit_index(audit_df, columns, key="Applicant_id", policy="last", date_col="Triggered Date"):
+    # columns maps audit column -> base column; absent audit columns are skipped
+    present = {src: dst for src, dst in columns.items() if src in audit_df.columns}
+    lookup_cols = [key] + list(present)
+    if policy == "latest" and date_col in audit_df.columns and date_col not in lookup_cols:
+        lookup_cols.append(date_col)
+
+    # Rows without a key (e.g. a Los App Id with no _<digits> suffix) can never
+    # match, and must not join to base rows whose Applicant_id is blank
+    keyed = audit_df[key].notna().to_numpy()
+    audit_keys = audit_df.loc[keyed, lookup_cols]
+    unique_audit = dedupe_audit(audit_keys, key=key, policy=policy, date_col=date_col)
+    frame = unique_audit.set_index(key)[list(present)].rename(columns=present)
+
+    return {
+        "frame": frame,
+        "key": key,
+        "policy": policy,
+        "audit_rows": len(audit_df),
+        "unkeyed_rows": int(len(audit_df) - len(audit_keys)),
+        "duplicate_ids": int(len(audit_keys) - len(unique_audit)),
+    }
+
+# ----------------------------------------------------------------------------
+# One keyed join for every audit column the base needs
+# ----------------------------------------------------------------------------
+def join_audit(base_df, audit_df, columns, key="Applicant_id", policy="last", date_col="Triggered Date",
+               audit_index=None):
+    if audit_index is None:
+        audit_index = build_audit_index(audit_df, columns, key=key, policy=policy, date_col=date_col)
+    frame = audit_index["frame"]
+
+    keys = base_df[key].to_numpy()
+    # Aligned to base_df so callers can assign columns where they belong
+    joined = frame.reindex(keys)
+    joined.index = base_df.index
+
+    matched = int((frame.index.get_indexer(keys) >= 0).sum())
+    stats = {
+        "base_rows": len(base_df),
+        "matched": matched,
+        "missed": len(base_df) - matched,
+        "audit_rows": audit_index["audit_rows"],
+        "duplicate_ids": audit_index["duplicate_ids"],
+        "unkeyed_rows": audit_index.get("unkeyed_rows", 0),
+        "policy": audit_index["policy"],
+        "columns": list(frame.columns),
+    }
+    return joined, stats
+
+# ----------------------------------------------------------------------------
+# Fold one more report into an existing index, as if it had been stacked after
+# the reports already indexed (used by the watch mode for newly arrived files)
+# ----------------------------------------------------------------------------
+def merge_audit_index(audit_index, audit_df, columns, date_col="Triggered Date"):
+    key, policy = audit_index["key"], audit_index["policy"]
+    added = build_audit_index(audit_df, columns, key=key, policy=policy, date_col=date_col)
+    old, new = audit_index["frame"], added["frame"]
+
+    order_col = columns.get(date_col)
+    if policy == "first":
+        frame = pd.concat([old, new[~new.index.isin(old.index)]])
+    elif policy == "latest" and order_col in old.columns and order_col in new.columns:
+        # Same rule as dedupe_audit: latest date wins, the newer report wins ties
+        stacked = pd.concat([old, new])
+        order = pd.to_datetime(stacked[order_col], errors='coerce').to_numpy()
+        stacked = stacked.assign(_order=order).sort_values("_order", kind="stable", na_position="first")
+        frame = stacked[~stacked.index.duplicated(keep="last")].drop(columns="_order")
+    else:
+        frame = pd.concat([old[~old.index.isin(new.index)], new])
+
+    audit_rows = audit_index["audit_rows"] + added["audit_rows"]
+    unkeyed_rows = audit_index.get("unkeyed_rows", 0) + added["unkeyed_rows"]
+    return {
+        "frame": frame,
+        "key": key,
+        "policy": policy,
+        "audit_rows": audit_rows,
+        "unkeyed_rows": unkeyed_rows,
+        "duplicate_ids": int(audit_rows - unkeyed_rows - len(frame)),
+    }
@@ -0,0 +1,154 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from pipeline import date_cols, place_product_name, prepare_inputs, reconcile
+from instrument import RunInstrumentation
+from mappings import load_mappings
+from synthetic import make_audit, make_base
+from transforms import coalesce_first, extract_applicant_id, strip_strings
+from writers import write_output
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+# ----------------------------------------------------------------------------
+# Row-wise apply (old app.py) vs vectorized coalesce
+# ----------------------------------------------------------------------------
+def bench_coalesce(rows):
+    df = make_base(rows)[date_cols]
+    as_dates = df.apply(lambda s: s.dt.date)
+
+    def get_disbursed_date(row):
+        for col in date_cols:
+            if pd.notna(row.get(col)):
+                return row[col]
+        return pd.NaT
+
+    old, old_secs = _timed(lambda: as_dates.apply(get_disbursed_date, axis=1))
+    new, new_secs = _timed(lambda: coalesce_first(df, date_cols))
+
+    # Same calendar dates, only the dtype differs
+    pd.testing.assert_series_equal(
+        pd.to_datetime(old, errors='coerce').astype("datetime64[ns]"),
+        new.astype("datetime64[ns]"),
+        check_names=False,
+    )
+    print(f"coalesce  rows={rows:>9,}  apply={old_secs:8.3f}s  vectorized={new_secs:8.3f}s  "
+          f"speedup={old_secs / new_secs:6.1f}x")
+
+# ----------------------------------------------------------------------------
+# Cell-by-cell strip + astype(str) ids (old prepare_audit) vs column-wise
+# normalization, on an audit export widened with extra text columns
+# ----------------------------------------------------------------------------
+def bench_strip(rows, extra_columns=20):
+    audit = make_audit(make_base(rows))
+    for i in range(extra_columns):
+        audit[f"Extra {i}"] = audit["Partner Name"] if i % 2 else audit["Remarks"]
+
+    def old_normalize(df):
+        df = df.map(lambda x: x.strip() if isinstance(x, str) else x)
+        df["Applicant_id"] = df["Los App Id"].astype(str).str.extract(r'_(\d+)$')[0].str.strip()
+        df["Applicant_id"] = df["Applicant_id"].astype(str).str.strip()
+        return df
+
+    def new_normalize(df):
+        df = strip_strings(df)
+        df["Applicant_id"] = extract_applicant_id(df["Los App Id"])
+        return df
+
+    old, old_secs = _timed(lambda: old_normalize(audit.copy()))
+    new, new_secs = _timed(lambda: new_normalize(audit.copy()))
+
+    pd.testing.assert_series_equal(old["Applicant_id"], new["Applicant_id"], check_dtype=False)
+    print(f"strip     rows={rows:>9,}  cols={audit.shape[1]:>3}  map={old_secs:8.3f}s  "
+          f"vectorized={new_secs:8.3f}s  speedup={old_secs / new_secs:6.1f}x")
+
+# ----------------------------------------------------------------------------
+# Every pipeline stage plus end-to-end, on synthetic base/audit frames.
+# Excel parsing is left out: it is measured by the run log on real files.
+# ----------------------------------------------------------------------------
+def bench_pipeline(rows, repeat=3, output_format=".parquet"):
+    mappings = load_mappings()
+    base = make_base(rows, mappings=mappings)
+    audit = make_audit(base, mappings=mappings)
+
+    best = None
+    for _ in range(repeat):
+        run = RunInstrumentation(memory=False)
+        with tempfile.TemporaryDirectory() as tmp:
+            base_df, audit_df = base.copy(), audit.copy()
+            with run.stage("clean", len(base_df) + len(audit_df)):
+                base_df, audit_df = prepare_inputs(base_df, audit_df)
+            base_df, _ = reconcile(base_df, audit_df, mappings, run=run)
+            base_df = place_product_name(base_df)
+            with run.stage("save", len(base_df)):
+                write_output(base_df, os.path.join(tmp, "output" + output_format))
+        summary = run.summary()
+        result = {
+            "rows": rows,
+            "audit_rows": len(audit),
+            "end_to_end_s": sum(s["wall_s"] for s in summary["stages"]),
+            "stages": {s["stage"]: s["wall_s"] for s in summary["stages"]},
+        }
+        if best is None or result["end_to_end_s"] < best["end_to_end_s"]:
+            best = result
+    return best
+
+def print_pipeline(results, baseline=None):
+    stages = list(dict.fromkeys(name for r in results for name in r["stages"])) + ["end-to-end"]
+    header = f"{'Stage':<18}" + "".join(f"{r['rows']:>14,}" for r in results)
+    print("\n⏱️ Pipeline benchmark (best wall seconds)")
+    print(header)
+    for name in stages:
+        line = f"{name:<18}"
+        for r in results:
+            secs = r["end_to_end_s"] if name == "end-to-end" else r["stages"].get(name, 0.0)
+            line += f"{secs:>14.4f}"
+        print(line)
+
+    if baseline:
+        previous = {r["rows"]: r for r in baseline.get("pipeline", [])}
+        print("\n📈 Change vs baseline (new / old end-to-end)")
+        for r in results:
+            old = previous.get(r["rows"])
+            if old:
+                print(f"{r['rows']:>12,} rows: {r['end_to_end_s'] / old['end_to_end_s']:6.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CKYC pipeline benchmarks on synthetic data")
+    parser.add_argument("--suite", choices=["pipeline", "coalesce", "strip", "all"], default="pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--format", choices=[".parquet", ".csv", ".xlsx"], default=".parquet",
+                        help="Output format timed in the save stage")
+    parser.add_argument("--json", default=None, help="Write results here for later comparison")
+    parser.add_argument("--compare", default=None, help="Earlier --json results to compare against")
+    args = parser.parse_args()
+
+    report = {"sizes": args.sizes}
+    if args.suite in ("coalesce", "all"):
+        for rows in args.sizes:
+            bench_coalesce(rows)
+    if args.suite in ("strip", "all"):
+        for rows in args.sizes:
+            bench_strip(rows)
+    if args.suite in ("pipeline", "all"):
+        report["pipeline"] = [bench_pipeline(rows, args.repeat, args.format) for rows in args.sizes]
+        baseline = None
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as fh:
+                baseline = json.load(fh)
+        print_pipeline(report["pipeline"], baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
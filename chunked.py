@@ -0,0 +1,121 @@
+import pandas as pd
+
+from pipeline import date_cols, place_product_name, prepare_base, reconcile
+from audit_join import build_audit_index
+from ingest_cache import cached_sheet_path, mixed_columns, restore_mixed
+from instrument import NO_INSTRUMENTATION
+from rules import PROFILES, computed_columns
+from writers import open_sink, select_columns
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Every chunk must write the same schema, so derived columns get fixed types
+OUTPUT_DTYPES = {
+    **{col: "datetime64[ns]" for col in date_cols},
+    "Approved/Disbursed Date": "datetime64[ns]",
+    "InwardDate": "datetime64[ns]",
+    "Completion Date": "datetime64[ns]",
+    "CKYC Upload Date": "datetime64[ns]",
+    "Month": "string",
+    "Workflow": "string",
+    "CKYC Status": "string",
+    "Final Status": "string",
+    "Product Name": "string",
+    "CKYC Number": "float64",
+    "CKYC Reporting TAT": "float64",
+    "CKYC Trigger TAT": "float64",
+    "CKYC ID Length": "float64",
+}
+
+# ----------------------------------------------------------------------------
+# Stream the base sheet: from the Parquet cache when fresh, else from Excel
+# ----------------------------------------------------------------------------
+def iter_base_chunks(base_file, chunk_size=DEFAULT_CHUNK_SIZE):
+    cached = cached_sheet_path(base_file)
+    if cached:
+        import pyarrow.parquet as pq
+
+        mixed = mixed_columns(cached)
+        for batch in pq.ParquetFile(cached).iter_batches(batch_size=chunk_size):
+            yield restore_mixed(batch.to_pandas(), mixed)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(base_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [f"Unnamed: {i}" if h is None else str(h) for i, h in enumerate(next(rows, ()))]
+        buffer = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            buffer.append(row[:len(header)])
+            if len(buffer) == chunk_size:
+                yield pd.DataFrame(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header)
+    finally:
+        workbook.close()
+
+# ----------------------------------------------------------------------------
+# Chunked run: audit index once, then base chunks straight to the output
+# ----------------------------------------------------------------------------
+def run_chunked(base_file, audit_df, mappings, output_path, chunk_size=DEFAULT_CHUNK_SIZE, duplicate_policy="last",
+                output_columns="all", observers=(), profile="app", targets=None, history=None,
+                run=NO_INSTRUMENTATION):
+    # observers see every reconciled chunk (cube spill, data-quality checks); each
+    # keeps only its own bounded state, so nothing grows with the base size
+    outputs = computed_columns(profile, targets)
+    with run.stage("audit index", len(audit_df)) as stage:
+        audit_index = build_audit_index(audit_df, PROFILES[profile]["audit_columns"], policy=duplicate_policy)
+        stage.rows_out = len(audit_index["frame"])
+    totals = None
+
+    sink = open_sink(output_path, dtypes=OUTPUT_DTYPES)
+    try:
+        chunks = iter_base_chunks(base_file, chunk_size)
+        number = 0
+        while True:
+            with run.stage("load") as stage:
+                chunk = next(chunks, None)
+                stage.rows_out = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                break
+            number += 1
+
+            with run.stage("clean", len(chunk)):
+                chunk = prepare_base(chunk)
+            chunk, stats = reconcile(chunk, None, mappings, duplicate_policy, audit_index=audit_index, run=run,
+                                     profile=profile, targets=targets)
+            with run.stage("save", len(chunk)):
+                sink.write(select_columns(place_product_name(chunk), output_columns, outputs))
+            if history is not None:
+                with run.stage("history", len(chunk)):
+                    history.write(select_columns(chunk, "derived", outputs))
+            for observer in observers:
+                with run.stage(observer.name, len(chunk)):
+                    observer.add(chunk)
+
+            if stats is None:
+                # No requested column needed the audit join
+                stats = {"base_rows": len(chunk), "matched": 0, "missed": len(chunk)}
+            if totals is None:
+                totals = {"base_rows": 0, "matched": 0, "missed": 0, "duplicate_ids": audit_index["duplicate_ids"],
+                          "unkeyed_rows": audit_index["unkeyed_rows"],
+                          "audit_rows": audit_index["audit_rows"], "policy": duplicate_policy,
+                          "columns": stats.get("columns", [])}
+            for key in ("base_rows", "matched", "missed"):
+                totals[key] += stats[key]
+            print(f"📦 Chunk {number}: {len(chunk)} rows ({sink.rows} written)")
+    except BaseException:
+        sink.close(commit=False)
+        raise
+    sink.close()
+
+    if totals is None:
+        totals = {"base_rows": 0, "matched": 0, "missed": 0, "duplicate_ids": audit_index["duplicate_ids"],
+                  "unkeyed_rows": audit_index["unkeyed_rows"],
+                  "audit_rows": audit_index["audit_rows"], "policy": duplicate_policy, "columns": []}
+    return totals
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from transforms import as_text
+from writers import open_sink, write_output
+
+try:
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:
+    pc = ds = None
+
+# Bump when the cube layout or its statistics change
+CUBE_VERSION = 1
+
+CUBE_KEYS = ["Month", "Product Name", "CKYC Status", "Final Status"]
+TAT_COLUMNS = {"CKYC Reporting TAT": "Reporting TAT", "CKYC Trigger TAT": "Trigger TAT"}
+PERCENTILES = {"P50": 0.5, "P90": 0.9, "P99": 0.99}
+
+# SLA thresholds in days; each TAT is counted into <0d, 0-7d, 8-15d, 16-30d, >30d
+DEFAULT_SLA_DAYS = (7, 15, 30)
+
+def default_cube_path(folder):
+    return os.path.join(folder, "ckyc_tat_cube.parquet")
+
+def _meta_path(cube_path):
+    return os.path.splitext(cube_path)[0] + ".json"
+
+def bucket_labels(sla_days):
+    labels, low = ["<0d"], 0
+    for high in sla_days:
+        labels.append(f"{low}-{high}d")
+        low = high + 1
+    return labels + [f">{sla_days[-1]}d"]
+
+def cube_columns(sla_days=DEFAULT_SLA_DAYS):
+    columns = CUBE_KEYS + ["Rows"]
+    for short in TAT_COLUMNS.values():
+        columns += [f"{short} Count", f"{short} Mean"] + [f"{short} {name}" for name in PERCENTILES]
+        columns += [f"{short} {label}" for label in bucket_labels(sla_days)]
+    return columns
+
+def _month_labels(month):
+    # Rows without a disbursed date have no Month; they still get a cube slice
+    return as_text(month).fillna("")
+
+# ----------------------------------------------------------------------------
+# Aggregate: one row per (Month, Product Name, CKYC Status, Final Status)
+# ----------------------------------------------------------------------------
+def build_cube(df, sla_days=DEFAULT_SLA_DAYS):
+    if df.empty:
+        return pd.DataFrame({col: pd.Series(dtype="str" if col in CUBE_KEYS else "float64")
+                             for col in cube_columns(sla_days)})
+    keys = pd.DataFrame({col: as_text(df[col]) for col in CUBE_KEYS}, index=df.index)
+    groups = keys.groupby(CUBE_KEYS, dropna=False, sort=False)
+    cube = groups.size().rename("Rows").to_frame()
+
+    bins = [-np.inf, -1] + list(sla_days) + [np.inf]
+    labels = bucket_labels(sla_days)
+    for col, short in TAT_COLUMNS.items():
+        tat = df[col].astype("float64")
+        grouped = tat.groupby([keys[k] for k in CUBE_KEYS], dropna=False, sort=False)
+        cube[f"{short} Count"] = grouped.count()
+        cube[f"{short} Mean"] = grouped.mean()
+        quantiles = grouped.quantile(list(PERCENTILES.values())).unstack()
+        for name, q in PERCENTILES.items():
+            cube[f"{short} {name}"] = quantiles[q]
+
+        buckets = pd.cut(tat, bins=bins, labels=labels)
+        counts = buckets.groupby([keys[k] for k in CUBE_KEYS] + [buckets], dropna=False, sort=False,
+                                 observed=False).size().unstack()
+        for label in labels:
+            cube[f"{short} {label}"] = counts[label].reindex(cube.index).fillna(0).astype("int64")
+    return cube.reset_index()
+
+def sort_cube(cube):
+    # Months in calendar order, rows without a Month last
+    order = pd.to_datetime(cube["Month"], format="%b'%y", errors='coerce')
+    return cube.assign(_order=order).sort_values(["_order"] + CUBE_KEYS[1:], na_position="last") \
+               .drop(columns="_order").reset_index(drop=True)
+
+# ----------------------------------------------------------------------------
+# Incremental refresh: a month is re-aggregated only when its rows changed
+# ----------------------------------------------------------------------------
+def cube_config(sla_days):
+    payload = {"cube_version": CUBE_VERSION, "sla_days": list(sla_days)}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+def month_hashes(df):
+    # Sum of row hashes per month: independent of row order, wraps on overflow
+    row_hash = pd.util.hash_pandas_object(df[CUBE_KEYS + list(TAT_COLUMNS)].astype(object), index=False)
+    grouped = row_hash.groupby(_month_labels(df["Month"]).to_numpy())
+    sums, counts = grouped.sum(), grouped.size()
+    return {month: (int(sums[month]) % 2**64, int(counts[month])) for month in sums.index}
+
+def _format_fingerprints(hashes):
+    return {month: f"{total:016x}-{count}" for month, (total, count) in hashes.items()}
+
+def month_fingerprints(df):
+    return _format_fingerprints(month_hashes(df))
+
+def _read_cube(cube_path):
+    ext = os.path.splitext(cube_path)[1].lower()
+    if ext == ".parquet":
+        return pd.read_parquet(cube_path)
+    if ext == ".csv":
+        return pd.read_csv(cube_path, keep_default_na=False, na_values=[""], dtype={k: "str" for k in CUBE_KEYS})
+    return pd.read_excel(cube_path, dtype={k: "str" for k in CUBE_KEYS})
+
+def load_cube(cube_path, config_fp):
+    meta_path = _meta_path(cube_path)
+    if not (os.path.exists(cube_path) and os.path.exists(meta_path)):
+        return None, {}
+    with open(meta_path, encoding="utf-8") as fh:
+        meta = json.load(fh)
+    if meta.get("config_fingerprint") != config_fp:
+        return None, {}
+    return _read_cube(cube_path), meta.get("months", {})
+
+def update_cube(df, cube_path, sla_days=DEFAULT_SLA_DAYS, full=False):
+    def build_months(changed):
+        return build_cube(df[_month_labels(df["Month"]).isin(changed)], sla_days)
+
+    return _refresh_cube(month_fingerprints(df), build_months, cube_path, sla_days, full)
+
+def _refresh_cube(fingerprints, build_months, cube_path, sla_days, full):
+    config_fp = cube_config(sla_days)
+    previous, saved = (None, {}) if full else load_cube(cube_path, config_fp)
+
+    changed = {month for month, fp in fingerprints.items() if saved.get(month) != fp}
+    if previous is None:
+        changed = set(fingerprints)
+
+    parts = [build_months(changed)] if changed or previous is None else []
+    if previous is not None:
+        kept = _month_labels(previous["Month"]).isin(set(fingerprints) - changed)
+        parts.insert(0, previous[kept.to_numpy()])
+    cube = sort_cube(pd.concat(parts, ignore_index=True))
+
+    # Counts stay integers; conform_frame would otherwise store them as doubles
+    counts = [c for c in cube_columns(sla_days) if c == "Rows" or c.endswith(" Count") or c.endswith("d")]
+    write_output(cube, cube_path, dtypes={c: "int64" for c in counts})
+    meta = {"config_fingerprint": config_fp, "months": fingerprints, "rows": len(cube)}
+    meta_tmp = _meta_path(cube_path) + ".tmp"
+    with open(meta_tmp, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, indent=2)
+    os.replace(meta_tmp, _meta_path(cube_path))
+    return cube, sorted(changed)
+
+# ----------------------------------------------------------------------------
+# Chunked runs: cube columns are spilled to a Parquet file next to the cube and
+# month hashes are summed as chunks stream by; changed months are then read
+# back and aggregated one at a time, so memory stays bounded by the chunk size
+# and the largest month
+# ----------------------------------------------------------------------------
+class CubeSpill:
+    name = "cube spill"
+
+    def __init__(self, cube_path):
+        if ds is None:
+            raise ValueError("pyarrow is required to build the TAT cube in chunks")
+        self.cube_path = cube_path
+        self.spill_path = os.path.splitext(cube_path)[0] + ".spill.parquet"
+        self.missing = []
+        self._hashes = {}
+        self._open = True
+        self._sink = open_sink(self.spill_path, dtypes={**{k: "string" for k in CUBE_KEYS},
+                                                         **{c: "float64" for c in TAT_COLUMNS}})
+
+    def add(self, chunk):
+        self.missing = [c for c in CUBE_KEYS + list(TAT_COLUMNS) if c not in chunk.columns]
+        if self.missing:
+            return
+        self._sink.write(chunk[CUBE_KEYS + list(TAT_COLUMNS)])
+        for month, (total, count) in month_hashes(chunk).items():
+            seen_total, seen_count = self._hashes.get(month, (0, 0))
+            self._hashes[month] = ((seen_total + total) % 2**64, seen_count + count)
+
+    def _month_rows(self, dataset, month):
+        month_col = pc.field("Month")
+        condition = month_col.is_null() | (month_col == "") if month == "" else month_col == month
+        return dataset.to_table(filter=condition).to_pandas()
+
+    def finish(self, sla_days=DEFAULT_SLA_DAYS, full=False):
+        self._sink.close()
+        self._open = False
+        try:
+            def build_months(changed):
+                if not changed:
+                    return build_cube(pd.DataFrame(), sla_days)
+                dataset = ds.dataset(self.spill_path, format="parquet")
+                return pd.concat([build_cube(self._month_rows(dataset, month), sla_days)
+                                  for month in sorted(changed)], ignore_index=True)
+
+            return _refresh_cube(_format_fingerprints(self._hashes), build_months, self.cube_path, sla_days, full)
+        finally:
+            self.discard()
+
+    def discard(self):
+        if self._open:
+            self._sink.close(commit=False)
+            self._open = False
+        if os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+# Source date columns and their declared text format. The workbooks normally
+# hold real Excel dates (parsed as-is); CSV or re-saved exports carry ISO text
+# such as 2024-01-31 or 2024-01-31 15:30:00.
+EXPORT_DATE_FORMAT = "ISO8601"
+BASE_DATE_FORMATS = {
+    "App Form DisbursalDate": EXPORT_DATE_FORMAT,
+    "Appform Approval Date": EXPORT_DATE_FORMAT,
+    "Recent Status Date": EXPORT_DATE_FORMAT,
+    "Appform Posting Date": EXPORT_DATE_FORMAT,
+}
+AUDIT_DATE_FORMATS = {
+    "Triggered Date": EXPORT_DATE_FORMAT,
+    "CKYC Completion Date": EXPORT_DATE_FORMAT,
+    "First Batch Upload Date": EXPORT_DATE_FORMAT,
+}
+
+# ----------------------------------------------------------------------------
+# Parse one column once into datetime64, resolving each distinct value once
+# ----------------------------------------------------------------------------
+def parse_date_column(values, fmt=None, normalize=True):
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        parsed = values.astype("datetime64[ns]")
+        return parsed.dt.normalize() if normalize else parsed
+
+    # Dates repeat heavily, so parse the distinct values and broadcast back
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    uniques = pd.Index(uniques, dtype=object)
+    if fmt:
+        parsed = _as_ns(pd.to_datetime(uniques, format=fmt, errors='coerce'))
+        failed = np.isnat(parsed)
+        if failed.any():
+            # Values that do not match the declared format are parsed one by one
+            parsed[failed] = _as_ns(pd.to_datetime(uniques[failed], format="mixed", errors='coerce'))
+    else:
+        parsed = _as_ns(pd.to_datetime(uniques, format="mixed", errors='coerce'))
+
+    lookup = np.append(parsed, np.datetime64("NaT", "ns"))
+    result = pd.Series(lookup[codes], index=values.index, name=values.name)
+    return result.dt.normalize() if normalize else result
+
+def _as_ns(parsed):
+    parsed = pd.DatetimeIndex(parsed)
+    if parsed.tz is not None:
+        parsed = parsed.tz_localize(None)
+    return parsed.to_numpy(dtype="datetime64[ns]").copy()
+
+def parse_date_columns(df, formats):
+    for col, fmt in formats.items():
+        if col in df.columns:
+            df[col] = parse_date_column(df[col], fmt)
+    return df
+
+# ----------------------------------------------------------------------------
+# Whole days between two datetime64 columns
+# ----------------------------------------------------------------------------
+def days_between(later, earlier):
+    return (later - earlier).dt.days
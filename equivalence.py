@@ -0,0 +1,93 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from pipeline import date_cols, prepare_inputs, reconcile
+from audit_join import DUPLICATE_POLICIES
+from incremental import compare_outputs
+from mappings import load_mappings
+from polars_backend import pl, reconcile_polars
+from synthetic import make_audit, make_base
+
+# ----------------------------------------------------------------------------
+# Edge cases the synthetic generator does not cover on its own
+# ----------------------------------------------------------------------------
+def edge_cases(mappings):
+    base = make_base(200, seed=3, mappings=mappings)
+    audit = make_audit(base, seed=4, mappings=mappings)
+    cases = {}
+
+    odd_ids = base.copy()
+    odd_ids["Applicant_id"] = odd_ids["Applicant_id"].astype(float)
+    odd_ids.loc[odd_ids.index[:5], "Applicant_id"] = np.nan
+    odd_audit = audit.copy()
+    odd_audit.loc[odd_audit.index[:5], "Los App Id"] = [None, "", "  LOS_", "NO-SUFFIX", " APP_00012 "]
+    cases["float and missing ids"] = (odd_ids, odd_audit)
+
+    text_dates = base.copy()
+    for col in date_cols:
+        text_dates[col] = text_dates[col].dt.strftime("%Y-%m-%d")
+    text_dates.loc[text_dates.index[:3], date_cols[0]] = ["not a date", "", None]
+    cases["text dates"] = (text_dates, audit)
+
+    no_dates = base.copy()
+    for col in date_cols:
+        no_dates[col] = pd.NaT
+    cases["no dates"] = (no_dates, audit)
+
+    cases["empty audit"] = (base, audit.iloc[0:0])
+
+    dupes = pd.concat([audit, audit.sample(frac=0.5, random_state=5)], ignore_index=True)
+    dupes["Triggered Date"] = dupes["Triggered Date"].where(np.arange(len(dupes)) % 3 != 0)
+    cases["heavy duplicates"] = (base, dupes)
+
+    same_day = audit.copy()
+    same_day["Triggered Date"] = pd.Timestamp("2024-01-01 15:30")
+    cases["timestamps with times"] = (base, same_day)
+    return cases
+
+# ----------------------------------------------------------------------------
+# Run both backends on the same raw frames and diff every column
+# ----------------------------------------------------------------------------
+def run_case(base, audit, mappings, policy):
+    expected, expected_stats = reconcile(*prepare_inputs(base.copy(), audit.copy()), mappings, policy)
+    actual, actual_stats = reconcile_polars(base.copy(), audit.copy(), mappings, policy)
+
+    mismatches = compare_outputs(expected, actual)
+    for key in ("matched", "missed", "duplicate_ids", "unkeyed_rows", "audit_rows"):
+        if expected_stats[key] != actual_stats[key]:
+            mismatches[f"<{key}>"] = f"{expected_stats[key]} vs {actual_stats[key]}"
+    return mismatches
+
+def run_all(sizes, seeds, policies):
+    mappings = load_mappings()
+    cases = []
+    for rows in sizes:
+        for seed in seeds:
+            base = make_base(rows, seed=seed, mappings=mappings)
+            cases.append((f"synthetic rows={rows} seed={seed}", base, make_audit(base, seed=seed + 1, mappings=mappings)))
+    cases += [(name, base, audit) for name, (base, audit) in edge_cases(mappings).items()]
+
+    failures = 0
+    for name, base, audit in cases:
+        for policy in policies:
+            mismatches = run_case(base, audit, mappings, policy)
+            status = "✅" if not mismatches else "❌"
+            print(f"{status} {name:<40} policy={policy:<7} {mismatches or ''}")
+            failures += bool(mismatches)
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the polars backend against the pandas path row for row")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 50_000])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1])
+    parser.add_argument("--policies", choices=DUPLICATE_POLICIES, nargs="+", default=list(DUPLICATE_POLICIES))
+    args = parser.parse_args()
+
+    if pl is None:
+        sys.exit("❌ polars is not installed - nothing to compare")
+    failures = run_all(args.sizes, args.seeds, args.policies)
+    print(f"\n{'✅ Backends agree' if not failures else f'❌ {failures} case(s) differ'}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,264 @@
+import argparse
+import os
+import uuid
+from datetime import date, timedelta
+
+import pandas as pd
+
+from chunked import OUTPUT_DTYPES
+from writers import conform_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = ds = pq = None
+
+RUN_COLUMN = "Run At"
+MONTH_SOURCE = "Approved/Disbursed Date"
+# Rows without a disbursal date still need a partition
+UNKNOWN_MONTH = "unknown"
+COMPACTED_FILE = "compacted.parquet"
+# Small row groups keep Product Name min/max statistics selective
+ROW_GROUP_ROWS = 64_000
+DEFAULT_COMPACT_AFTER_DAYS = 7
+
+def default_history_path(folder):
+    return os.path.join(folder, "ckyc_history")
+
+def _require_pyarrow():
+    if pa is None:
+        raise ValueError("pyarrow is required for the history store")
+
+# ----------------------------------------------------------------------------
+# Layout: <store>/month=YYYY-MM/run_date=YYYY-MM-DD/part-*.parquet. The month
+# key comes from the disbursal date rather than the Month text, so partitions
+# sort in time order and legacy profiles ("%b" months) partition the same way.
+# ----------------------------------------------------------------------------
+def month_key(value):
+    # "2024-01", "Jan'24", "Jan 2024" or a date -> "2024-01"
+    for fmt in ("%b'%y", "%Y-%m", None):
+        try:
+            parsed = pd.to_datetime(value, format=fmt)
+        except (ValueError, TypeError):
+            continue
+        if not pd.isna(parsed):
+            return parsed.strftime("%Y-%m")
+    raise ValueError(f"Unrecognised month '{value}', expected e.g. 2024-01 or Jan'24")
+
+def _month_keys(df):
+    if MONTH_SOURCE not in df.columns:
+        return pd.Series(UNKNOWN_MONTH, index=df.index)
+    keys = pd.to_datetime(df[MONTH_SOURCE], errors="coerce").dt.strftime("%Y-%m")
+    return keys.fillna(UNKNOWN_MONTH)
+
+def _partition_dir(store_dir, month, run_date):
+    return os.path.join(store_dir, f"month={month}", f"run_date={run_date}")
+
+def _partitions(store_dir):
+    # (month, run_date, directory) for every partition, from directory names alone
+    found = []
+    if not os.path.isdir(store_dir):
+        return found
+    for month_dir in sorted(os.listdir(store_dir)):
+        if not month_dir.startswith("month="):
+            continue
+        for run_dir in sorted(os.listdir(os.path.join(store_dir, month_dir))):
+            if run_dir.startswith("run_date="):
+                found.append((month_dir[len("month="):], run_dir[len("run_date="):],
+                              os.path.join(store_dir, month_dir, run_dir)))
+    return found
+
+def _partition_files(directory):
+    files = sorted(f for f in os.listdir(directory) if f.endswith(".parquet"))
+    if COMPACTED_FILE in files:
+        # Parts already folded into the compacted file (left by an interrupted compaction)
+        sources = _compacted_sources(os.path.join(directory, COMPACTED_FILE))
+        files = [f for f in files if f not in sources]
+    return [os.path.join(directory, f) for f in files]
+
+def _compacted_sources(path):
+    metadata = pq.read_schema(path).metadata or {}
+    return set(metadata.get(b"sources", b"").decode("utf-8").split("\n")) - {""}
+
+def _write_table(table, path):
+    tmp_path = path + ".tmp"
+    try:
+        pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_ROWS)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+# ----------------------------------------------------------------------------
+# Writer: one part file per month partition and write() call; chunked runs
+# call write() once per chunk with the same run timestamp
+# ----------------------------------------------------------------------------
+class HistoryWriter:
+    def __init__(self, store_dir, run_at=None):
+        _require_pyarrow()
+        self.store_dir = store_dir
+        self.run_at = pd.Timestamp(run_at or pd.Timestamp.now()).floor("s")
+        self.run_date = self.run_at.strftime("%Y-%m-%d")
+        self.rows = 0
+        self.months = set()
+        self.paths = []
+
+    def write(self, df):
+        df = conform_frame(df, OUTPUT_DTYPES)
+        df[RUN_COLUMN] = pd.Series(self.run_at, index=df.index).astype("datetime64[ns]")
+        keys = _month_keys(df)
+        name = f"part-{self.run_at:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+        for month, part in df.groupby(keys, sort=True):
+            directory = _partition_dir(self.store_dir, month, self.run_date)
+            os.makedirs(directory, exist_ok=True)
+            if "Product Name" in part.columns:
+                part = part.sort_values("Product Name", kind="stable")
+            path = os.path.join(directory, name)
+            _write_table(pa.Table.from_pandas(part, preserve_index=False), path)
+            self.paths.append(path)
+            self.months.add(month)
+        self.rows += len(df)
+
+    def discard(self):
+        # A failed run leaves no partial snapshot behind
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self.paths = []
+
+def append_snapshot(df, store_dir, run_at=None):
+    writer = HistoryWriter(store_dir, run_at)
+    writer.write(df)
+    return writer
+
+# ----------------------------------------------------------------------------
+# Compaction: run_date partitions older than a few days are merged into one
+# file, sorted by run and Product Name. The compacted file lists the parts it
+# replaced, so a crash before they are deleted never double-counts rows.
+# ----------------------------------------------------------------------------
+def compact(store_dir, older_than_days=DEFAULT_COMPACT_AFTER_DAYS, today=None):
+    _require_pyarrow()
+    cutoff = ((today or date.today()) - timedelta(days=older_than_days)).isoformat()
+    compacted = 0
+    for month, run_date, directory in _partitions(store_dir):
+        if run_date >= cutoff:
+            continue
+        files = _partition_files(directory)
+        names = {os.path.basename(f) for f in files}
+        if names == {COMPACTED_FILE} or not files:
+            continue
+        table = pa.concat_tables([pq.read_table(f) for f in files], promote_options="default")
+        sort_keys = [(col, "ascending") for col in (RUN_COLUMN, "Product Name") if col in table.column_names]
+        table = table.sort_by(sort_keys)
+        sources = names - {COMPACTED_FILE}
+        if COMPACTED_FILE in names:
+            sources |= _compacted_sources(os.path.join(directory, COMPACTED_FILE))
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               b"sources": "\n".join(sorted(sources)).encode("utf-8")})
+        _write_table(table, os.path.join(directory, COMPACTED_FILE))
+        for name in sources:
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+        compacted += 1
+    return compacted
+
+# ----------------------------------------------------------------------------
+# Reader: partitions are pruned by directory name before any file is opened;
+# Product Name is pushed down to row-group statistics, and only the requested
+# columns are read
+# ----------------------------------------------------------------------------
+def read_history(store_dir, months=None, products=None, columns=None, since=None, until=None):
+    _require_pyarrow()
+    wanted = {month_key(m) for m in months} if months else None
+    since = pd.Timestamp(since).strftime("%Y-%m-%d") if since else None
+    until = pd.Timestamp(until).strftime("%Y-%m-%d") if until else None
+
+    files = []
+    for month, run_date, directory in _partitions(store_dir):
+        if wanted is not None and month not in wanted:
+            continue
+        if (since and run_date < since) or (until and run_date > until):
+            continue
+        files += _partition_files(directory)
+    if not files:
+        return pd.DataFrame(columns=columns or [])
+
+    # Runs with different --columns / profiles wrote different schemas
+    schema = pa.unify_schemas([pq.read_schema(f) for f in files], promote_options="permissive")
+    schema = schema.remove_metadata()
+    dataset = ds.dataset(files, schema=schema, format="parquet")
+    missing = [c for c in columns or [] if c not in schema.names]
+    if missing:
+        raise ValueError(f"Column(s) {missing} are not in the history store, expected some of {schema.names}")
+
+    condition = None
+    if products:
+        if "Product Name" not in schema.names:
+            raise ValueError("The history store has no 'Product Name' column to filter on")
+        condition = pc.field("Product Name").isin(list(products))
+    table = dataset.to_table(columns=columns, filter=condition)
+    return table.to_pandas()
+
+# ----------------------------------------------------------------------------
+# Trends: the last run of each period, as status counts and TAT medians
+# ----------------------------------------------------------------------------
+def trend(store_dir, freq="W", months=None, products=None, since=None, until=None):
+    columns = [RUN_COLUMN, "Final Status", "CKYC Reporting TAT", "CKYC Trigger TAT"]
+    df = read_history(store_dir, months, products, columns, since, until)
+    if df.empty:
+        return pd.DataFrame()
+    period = df[RUN_COLUMN].dt.to_period(freq)
+    # A period's snapshot is its latest run, not the sum of every run in it
+    latest = df[RUN_COLUMN].groupby(period).transform("max")
+    df = df[df[RUN_COLUMN] == latest].assign(Period=period.astype("str"))
+
+    counts = df.pivot_table(index="Period", columns="Final Status", values=RUN_COLUMN, aggfunc="size",
+                            fill_value=0, observed=True)
+    counts = counts.rename(columns={"": "No Status"})
+    medians = df.groupby("Period")[["CKYC Reporting TAT", "CKYC Trigger TAT"]].median()
+    medians.columns = [f"Median {col.replace('CKYC ', '')}" for col in medians.columns]
+    result = counts.join(medians)
+    result.insert(0, "Run At", df.groupby("Period")[RUN_COLUMN].max())
+    return result.reset_index()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query and maintain the CKYC run history")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in [("query", "Read history rows"), ("trend", "Status counts and TAT medians per period")]:
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument("store", help="History store directory")
+        command.add_argument("--month", nargs="+", default=None, help="Months to read, e.g. 2024-01 or Jan'24")
+        command.add_argument("--product", nargs="+", default=None, help="Product Names to read")
+        command.add_argument("--since", default=None, help="First run date (YYYY-MM-DD)")
+        command.add_argument("--until", default=None, help="Last run date (YYYY-MM-DD)")
+        command.add_argument("--output", default=None, help="Write the result to .csv/.xlsx/.parquet")
+    sub.choices["query"].add_argument("--columns", nargs="+", default=None, help="Columns to read (default: all)")
+    sub.choices["trend"].add_argument("--freq", default="W", help="Period: D, W or M (default: W)")
+    pack = sub.add_parser("compact", help="Merge the part files of old run_date partitions")
+    pack.add_argument("store", help="History store directory")
+    pack.add_argument("--older-than", type=int, default=DEFAULT_COMPACT_AFTER_DAYS, help="Days (default: 7)")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "compact":
+            print(f"🗜️ {compact(args.store, args.older_than)} partition(s) compacted in {args.store}")
+            raise SystemExit(0)
+        if args.command == "query":
+            result = read_history(args.store, args.month, args.product, args.columns, args.since, args.until)
+        else:
+            result = trend(args.store, args.freq, args.month, args.product, args.since, args.until)
+    except ValueError as e:
+        raise SystemExit(f"❌ {str(e)}")
+
+    if args.output:
+        from writers import write_output
+
+        write_output(result, args.output)
+        print(f"✅ {len(result)} rows -> {args.output}")
+    else:
+        print(result.to_string(index=False) if len(result) else "No matching history")
@@ -0,0 +1,325 @@
+import hashlib
+import json
+import os
+import re
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Parsed sheets are kept in a hidden folder next to the source workbook
+CACHE_DIR_NAME = ".ckyc_cache"
+MANIFEST_NAME = "manifest.json"
+
+# ----------------------------------------------------------------------------
+# Cache key: path + size + mtime, confirmed by a content hash
+# ----------------------------------------------------------------------------
+def cache_dir_for(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+
+def source_key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(cache_dir):
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        # A damaged manifest only costs one Excel re-parse
+        return {}
+
+def save_manifest(cache_dir, manifest):
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def is_fresh(path, entry, cache_dir):
+    if not entry:
+        return False
+    if not all(os.path.exists(os.path.join(cache_dir, s["file"])) for s in entry.get("sheets", [])):
+        return False
+    stat = os.stat(path)
+    if entry.get("size") != stat.st_size:
+        return False
+    if entry.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    # Touched but possibly unchanged (copied, re-saved): let the content decide
+    if entry.get("sha256") == file_hash(path):
+        entry["mtime_ns"] = stat.st_mtime_ns
+        return True
+    return False
+
+# ----------------------------------------------------------------------------
+# Build / read / invalidate
+# ----------------------------------------------------------------------------
+# Mixed number/text Excel columns are split by cell type, so a cache hit
+# returns the same Python values (258 stays an int) as parsing the workbook.
+# The layout is kept in the Parquet schema metadata under MIXED_KEY.
+MIXED_KEY = b"ckyc_mixed_columns"
+MIXED_SEPARATOR = "::"
+_MIXED_DTYPES = {"int": "Int64", "float": "float64", "bool": "boolean", "datetime": "datetime64[ns]"}
+
+def _cell_kind(value):
+    if isinstance(value, str):
+        return "text"
+    if isinstance(value, (bool, np.bool_)):
+        return "bool"
+    if isinstance(value, (int, np.integer)):
+        return "int"
+    if isinstance(value, (float, np.floating)):
+        return "float"
+    if isinstance(value, (datetime, np.datetime64)):
+        return "datetime"
+    return "text"
+
+def _arrow_safe(df):
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    mixed = {}
+    for col in list(df.columns):
+        if df[col].dtype != object:
+            continue
+        try:
+            pa.array(df[col], from_pandas=True)
+            continue
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        values = df[col]
+        kinds = values.map(_cell_kind, na_action="ignore")
+        # Only unknown cell types (e.g. times) are written as text
+        text = kinds == "text"
+        df[col] = values.where(text).map(str, na_action="ignore").astype("string")
+        mixed[col] = []
+        for kind, dtype in _MIXED_DTYPES.items():
+            cells = kinds == kind
+            if cells.any():
+                df[f"{col}{MIXED_SEPARATOR}{kind}"] = values.where(cells).astype(object).astype(dtype)
+                mixed[col].append(kind)
+    return df, mixed
+
+def restore_mixed(df, mixed):
+    # Inverse of _arrow_safe: one object column per mixed column, in place
+    for col, kinds in mixed.items():
+        values = np.array(df[col].astype(object).where(df[col].notna(), np.nan), dtype=object)
+        for kind in kinds:
+            part = df.pop(f"{col}{MIXED_SEPARATOR}{kind}")
+            cells = part.notna().to_numpy()
+            if kind == "datetime":
+                values[cells] = list(part[cells])
+            else:
+                values[cells] = part[cells].to_numpy(dtype=object)
+        df[col] = values
+    return df
+
+def mixed_columns(parquet_path):
+    metadata = pq.read_schema(parquet_path).metadata or {}
+    return json.loads(metadata.get(MIXED_KEY, b"{}"))
+
+def read_cached_sheet(parquet_path):
+    return restore_mixed(pd.read_parquet(parquet_path), mixed_columns(parquet_path))
+
+def _write_parquet(df, path):
+    safe, mixed = _arrow_safe(df)
+    table = pa.Table.from_pandas(safe, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           MIXED_KEY: json.dumps(mixed).encode("utf-8")})
+    pq.write_table(table, path)
+
+def _sheet_file(path, index, sheet):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    safe_sheet = re.sub(r"[^\w\-]+", "_", str(sheet)).strip("_")
+    return f"{stem}__{index}_{safe_sheet}.parquet"
+
+def _write_sheets(path, previous=None):
+    # Parse the workbook and write one Parquet file per sheet; the caller records the entry
+    cache_dir = cache_dir_for(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    stat = os.stat(path)
+    sheets = pd.read_excel(path, sheet_name=None)
+    _remove_sheet_files(cache_dir, previous)
+
+    entry = {
+        "source": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": file_hash(path),
+        "sheets": [],
+    }
+    for index, (sheet, df) in enumerate(sheets.items()):
+        file_name = _sheet_file(path, index, sheet)
+        tmp_path = os.path.join(cache_dir, file_name + ".tmp")
+        _write_parquet(df, tmp_path)
+        os.replace(tmp_path, os.path.join(cache_dir, file_name))
+        entry["sheets"].append({"name": str(sheet), "file": file_name, "rows": len(df)})
+    return entry, sheets
+
+def build_cache(path):
+    cache_dir = cache_dir_for(path)
+    manifest = load_manifest(cache_dir)
+    key = source_key(path)
+    entry, sheets = _write_sheets(path, manifest.get(key))
+
+    manifest[key] = entry
+    save_manifest(cache_dir, manifest)
+    return sheets
+
+def _remove_sheet_files(cache_dir, entry):
+    for sheet in (entry or {}).get("sheets", []):
+        sheet_path = os.path.join(cache_dir, sheet["file"])
+        if os.path.exists(sheet_path):
+            os.remove(sheet_path)
+
+def invalidate(path):
+    cache_dir = cache_dir_for(path)
+    manifest = load_manifest(cache_dir)
+    entry = manifest.pop(source_key(path), None)
+    if entry is None:
+        return False
+    _remove_sheet_files(cache_dir, entry)
+    save_manifest(cache_dir, manifest)
+    return True
+
+def read_excel_cached(path, sheet_name=0, rebuild=False):
+    if pa is None:
+        print("⚠️ pyarrow is not installed - reading Excel without the ingest cache")
+        return pd.read_excel(path, sheet_name=sheet_name)
+
+    cache_dir = cache_dir_for(path)
+    manifest = load_manifest(cache_dir)
+    entry = manifest.get(source_key(path))
+
+    if rebuild or not is_fresh(path, entry, cache_dir):
+        build_cache(path)
+        # A miss returns the cached copy too, so both runs see identical frames
+        manifest = load_manifest(cache_dir)
+        entry = manifest[source_key(path)]
+    else:
+        # mtime may have been refreshed by the hash check
+        save_manifest(cache_dir, manifest)
+    if isinstance(sheet_name, int):
+        sheet = entry["sheets"][sheet_name]
+    else:
+        matches = [s for s in entry["sheets"] if s["name"] == str(sheet_name)]
+        if not matches:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found in {path}")
+        sheet = matches[0]
+    return read_cached_sheet(os.path.join(cache_dir, sheet["file"]))
+
+def cached_sheet_path(path, sheet_index=0):
+    # Parquet file for a sheet if the cache is fresh, else None (never parses Excel)
+    if pa is None:
+        return None
+    cache_dir = cache_dir_for(path)
+    entry = load_manifest(cache_dir).get(source_key(path))
+    if not is_fresh(path, entry, cache_dir):
+        return None
+    return os.path.join(cache_dir, entry["sheets"][sheet_index]["file"])
+
+# ----------------------------------------------------------------------------
+# Several workbooks at once: Excel parsing is CPU-bound, so misses are parsed
+# in a process pool; workers only write Parquet and the parent owns manifests
+# ----------------------------------------------------------------------------
+def _parse_worker(path, previous):
+    entry, _ = _write_sheets(path, previous)
+    return entry
+
+def _read_excel_worker(path):
+    return pd.read_excel(path)
+
+def read_many_cached(paths, workers=None, rebuild=False):
+    paths = list(paths)
+    workers = workers or os.cpu_count() or 1
+
+    if pa is None:
+        print("⚠️ pyarrow is not installed - reading Excel without the ingest cache")
+        if workers == 1 or len(paths) == 1:
+            return [pd.read_excel(path) for path in paths]
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            return list(pool.map(_read_excel_worker, paths))
+
+    manifests = {}
+    stale = []
+    for path in paths:
+        cache_dir = cache_dir_for(path)
+        manifest = manifests.setdefault(cache_dir, load_manifest(cache_dir))
+        if rebuild or not is_fresh(path, manifest.get(source_key(path)), cache_dir):
+            stale.append(path)
+
+    if stale:
+        previous = [manifests[cache_dir_for(p)].get(source_key(p)) for p in stale]
+        if workers == 1 or len(stale) == 1:
+            entries = [_parse_worker(p, prev) for p, prev in zip(stale, previous)]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=min(workers, len(stale))) as pool:
+                entries = list(pool.map(_parse_worker, stale, previous))
+        for path, entry in zip(stale, entries):
+            manifests[cache_dir_for(path)][source_key(path)] = entry
+
+    for cache_dir, manifest in manifests.items():
+        save_manifest(cache_dir, manifest)
+
+    frames = []
+    for path in paths:
+        cache_dir = cache_dir_for(path)
+        entry = manifests[cache_dir][source_key(path)]
+        frames.append(read_cached_sheet(os.path.join(cache_dir, entry["sheets"][0]["file"])))
+    return frames
+
+# ----------------------------------------------------------------------------
+# Command line: python ingest_cache.py {rebuild|invalidate|status} FILE...
+# ----------------------------------------------------------------------------
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the Parquet ingest cache for Excel inputs")
+    parser.add_argument("command", choices=["rebuild", "invalidate", "status"])
+    parser.add_argument("files", nargs="+")
+    args = parser.parse_args(argv)
+
+    if pa is None:
+        sys.exit("❌ Error: pyarrow is required for the ingest cache.")
+
+    for path in args.files:
+        if args.command == "rebuild":
+            if not os.path.exists(path):
+                print(f"❌ Not found: {path}")
+                continue
+            sheets = build_cache(path)
+            print(f"✅ Rebuilt cache for {path} ({len(sheets)} sheet(s))")
+        elif args.command == "invalidate":
+            if invalidate(path):
+                print(f"🗑️ Invalidated cache for {path}")
+            else:
+                print(f"ℹ️ No cache entry for {path}")
+        else:
+            cache_dir = cache_dir_for(path)
+            entry = load_manifest(cache_dir).get(source_key(path))
+            state = "fresh" if os.path.exists(path) and is_fresh(path, entry, cache_dir) else "stale/missing"
+            print(f"{path}: {state}")
+
+if __name__ == "__main__":
+    main()
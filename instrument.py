@@ -0,0 +1,157 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+# ----------------------------------------------------------------------------
+# One record per named stage; repeated stages (chunks) are accumulated
+# ----------------------------------------------------------------------------
+class StageRecord:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_mem = 0
+        self.rows_in = 0
+        self.rows_out = 0
+
+    def as_dict(self):
+        return {
+            "stage": self.name,
+            "calls": self.calls,
+            "wall_s": round(self.wall, 4),
+            "cpu_s": round(self.cpu, 4),
+            "peak_mem_delta_mb": round(self.peak_mem / 2**20, 2),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+        }
+
+class Stage:
+    def __init__(self, rows_in):
+        self.rows_in = rows_in
+        self.rows_out = None
+
+class RunInstrumentation:
+    # tracemalloc hooks every allocation, so memory tracking is opt-in
+    def __init__(self, memory=False, profile_stage=None, profiler="cprofile"):
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profiler}', expected one of {PROFILERS}")
+        self.memory = memory
+        self.profile_stage = profile_stage
+        self.profiler = profiler
+        self.records = {}
+        self.started = datetime.now()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self.profile_output = None
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=0):
+        stage = Stage(rows_in)
+        record = self.records.setdefault(name, StageRecord(name))
+        profiler = self._start_profiler() if name == self.profile_stage else None
+
+        if self.memory:
+            tracemalloc.reset_peak()
+            mem_before = tracemalloc.get_traced_memory()[0]
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stage
+        finally:
+            record.wall += time.perf_counter() - wall
+            record.cpu += time.process_time() - cpu
+            if self.memory:
+                record.peak_mem = max(record.peak_mem, tracemalloc.get_traced_memory()[1] - mem_before)
+            record.calls += 1
+            record.rows_in += stage.rows_in
+            record.rows_out += stage.rows_in if stage.rows_out is None else stage.rows_out
+            if profiler is not None:
+                self._stop_profiler(profiler, name)
+
+    # ------------------------------------------------------------------------
+    # Optional profiler for one named stage
+    # ------------------------------------------------------------------------
+    def _start_profiler(self):
+        if self.profiler == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("⚠️ pyinstrument is not installed - falling back to cProfile")
+                self.profiler = "cprofile"
+            else:
+                profiler = Profiler()
+                profiler.start()
+                return profiler
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop_profiler(self, profiler, name):
+        if self.profiler == "pyinstrument":
+            profiler.stop()
+            self.profile_output = profiler.output_text(unicode=True)
+            return
+        import pstats
+
+        profiler.disable()
+        buffer = io.StringIO()
+        pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(25)
+        self.profile_output = buffer.getvalue()
+
+    # ------------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------------
+    def summary(self):
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "argv": sys.argv[1:],
+            "total_wall_s": round(time.perf_counter() - self._start_wall, 4),
+            "total_cpu_s": round(time.process_time() - self._start_cpu, 4),
+            "memory_tracked": self.memory,
+            "stages": [record.as_dict() for record in self.records.values()],
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print("\n⏱️ Stage timings")
+        print(f"{'Stage':<22}{'Calls':>6}{'Wall s':>10}{'CPU s':>10}{'Peak MB':>10}{'Rows in':>11}{'Rows out':>11}")
+        for row in summary["stages"]:
+            peak = f"{row['peak_mem_delta_mb']:.1f}" if self.memory else "-"
+            print(f"{row['stage']:<22}{row['calls']:>6}{row['wall_s']:>10.3f}{row['cpu_s']:>10.3f}"
+                  f"{peak:>10}{row['rows_in']:>11,}{row['rows_out']:>11,}")
+        print(f"{'Total':<22}{'':>6}{summary['total_wall_s']:>10.3f}{summary['total_cpu_s']:>10.3f}")
+        if self.profile_output:
+            print(f"\n🔬 Profile of stage '{self.profile_stage}' ({self.profiler})")
+            print(self.profile_output)
+        elif self.profile_stage and self.profile_stage not in self.records:
+            print(f"⚠️ --profile-stage '{self.profile_stage}' never ran; stages in this run: "
+                  f"{', '.join(self.records)}")
+
+    def write_log(self, path):
+        # One JSON object per line, one line per run
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(self.summary()) + "\n")
+
+    def close(self):
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+# Used when a caller does not pass an instrumentation object
+class _NoInstrumentation:
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=0):
+        yield Stage(rows_in)
+
+NO_INSTRUMENTATION = _NoInstrumentation()
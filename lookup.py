@@ -0,0 +1,334 @@
+import argparse
+import json
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from transforms import normalize_ids
+from writers import conform_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pq = None
+
+STORE_VERSION = 1
+RECORDS_FILE = "records.arrow"
+# Point-lookup keys: store column -> index file prefix
+INDEXED_COLUMNS = {"Applicant_id": "applicant_id", "CKYC Number": "ckyc_number"}
+# Filters accepted by scan(): argument / query parameter -> store column
+SCAN_FILTERS = {"month": "Month", "product": "Product Name", "final_status": "Final Status"}
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+def _require_pyarrow():
+    if pa is None:
+        raise ValueError("pyarrow is required for the lookup store")
+
+def _key_hashes(values):
+    # Keys are compared as normalized strings, so 123, 123.0 and " 123" all match
+    keys = normalize_ids(pd.Series(values))
+    present = keys.notna().to_numpy()
+    return pd.util.hash_array(keys.to_numpy(dtype=object)[present]), present, keys
+
+def _query_keys(values):
+    # Same normalization as normalize_ids, without pandas overhead on a handful of ids
+    keys = []
+    for value in values:
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            continue
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        key = str(value).strip()
+        if key:
+            keys.append(key)
+    return list(dict.fromkeys(keys))
+
+# ----------------------------------------------------------------------------
+# Store builder: records as an uncompressed Arrow IPC file (memory-mappable),
+# plus per key a sorted array of key hashes and the matching row numbers
+# ----------------------------------------------------------------------------
+class StoreWriter:
+    def __init__(self, store_dir):
+        _require_pyarrow()
+        self.store_dir = store_dir
+        self.rows = 0
+        self._writer = None
+        self._sink = None
+        self._schema = None
+        self._hashes = {col: [] for col in INDEXED_COLUMNS}
+        self._positions = {col: [] for col in INDEXED_COLUMNS}
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.store_dir, name)
+
+    def write(self, df):
+        df = conform_frame(df)
+        for col in INDEXED_COLUMNS:
+            if col in df.columns:
+                # One key type in the file, whatever type the output was read back as
+                hashes, present, keys = _key_hashes(df[col])
+                df[col] = keys.astype("string")
+                self._hashes[col].append(hashes)
+                self._positions[col].append(np.flatnonzero(present) + self.rows)
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            fields = [pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema]
+            self._schema = pa.schema(fields)
+            self._sink = pa.OSFile(self._path(RECORDS_FILE + ".tmp"), "wb")
+            self._writer = pa.ipc.new_file(self._sink, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+        self.rows += len(df)
+
+    def close(self, commit=True):
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+        if not commit:
+            # A failed build leaves any previous store untouched
+            if os.path.exists(self._path(RECORDS_FILE + ".tmp")):
+                os.remove(self._path(RECORDS_FILE + ".tmp"))
+            return
+        if self._writer is not None:
+            os.replace(self._path(RECORDS_FILE + ".tmp"), self._path(RECORDS_FILE))
+
+        indexed = []
+        for col, prefix in INDEXED_COLUMNS.items():
+            if not self._hashes[col]:
+                continue
+            hashes = np.concatenate(self._hashes[col])
+            positions = np.concatenate(self._positions[col]).astype("int64")
+            order = np.argsort(hashes, kind="stable")
+            for suffix, values in ((".hash.npy", hashes[order]), (".rows.npy", positions[order])):
+                with open(self._path(prefix + suffix + ".tmp"), "wb") as fh:
+                    np.save(fh, values)
+                os.replace(self._path(prefix + suffix + ".tmp"), self._path(prefix + suffix))
+            indexed.append(col)
+
+        # Written last: a reader only trusts files the meta describes
+        meta = {"store_version": STORE_VERSION, "rows": self.rows, "indexed": indexed,
+                "built": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        with open(self._path("meta.json.tmp"), "w", encoding="utf-8") as fh:
+            json.dump(meta, fh, indent=2)
+        os.replace(self._path("meta.json.tmp"), self._path("meta.json"))
+
+def build_store(df, store_dir):
+    writer = StoreWriter(store_dir)
+    try:
+        writer.write(df)
+    except BaseException:
+        writer.close(commit=False)
+        raise
+    writer.close()
+    return writer.rows
+
+def build_store_from_file(path, store_dir, batch_size=100_000):
+    # Parquet and CSV outputs are streamed; a workbook has to be read whole
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        batches = (b.to_pandas() for b in pq.ParquetFile(path).iter_batches(batch_size=batch_size))
+    elif ext == ".csv":
+        batches = pd.read_csv(path, chunksize=batch_size, dtype={col: "str" for col in INDEXED_COLUMNS})
+    else:
+        batches = [pd.read_excel(path)]
+
+    writer = StoreWriter(store_dir)
+    try:
+        for batch in batches:
+            writer.write(batch)
+    except BaseException:
+        writer.close(commit=False)
+        raise
+    writer.close()
+    return writer.rows
+
+# ----------------------------------------------------------------------------
+# Reader: everything is memory-mapped, so only touched pages are paged in
+# ----------------------------------------------------------------------------
+class LookupStore:
+    def __init__(self, store_dir):
+        _require_pyarrow()
+        with open(os.path.join(store_dir, "meta.json"), encoding="utf-8") as fh:
+            self.meta = json.load(fh)
+        if self.meta.get("store_version") != STORE_VERSION:
+            raise ValueError(f"Lookup store {store_dir} is version {self.meta.get('store_version')}, "
+                             f"expected {STORE_VERSION} - rebuild it")
+        self.store_dir = store_dir
+        self._source = pa.memory_map(os.path.join(store_dir, RECORDS_FILE), "r")
+        self.table = pa.ipc.open_file(self._source).read_all()
+        self.indexes = {}
+        for col in self.meta["indexed"]:
+            prefix = os.path.join(store_dir, INDEXED_COLUMNS[col])
+            self.indexes[col] = (np.load(prefix + ".hash.npy", mmap_mode="r"),
+                                 np.load(prefix + ".rows.npy", mmap_mode="r"))
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def _take(self, rows, columns=None, as_table=False):
+        table = self.table if columns is None else self.table.select(columns)
+        result = table.take(pa.array(rows, type=pa.int64()))
+        return result if as_table else result.to_pandas()
+
+    def lookup(self, column, values, columns=None, as_table=False):
+        if column not in self.indexes:
+            raise ValueError(f"'{column}' is not indexed in this store")
+        sorted_hashes, positions = self.indexes[column]
+        keys = _query_keys(values)
+        hashes = pd.util.hash_array(np.array(keys, dtype=object))
+
+        left = np.searchsorted(sorted_hashes, hashes, side="left")
+        right = np.searchsorted(sorted_hashes, hashes, side="right")
+        if not (right > left).any():
+            return self._take([], columns, as_table)
+        rows = np.unique(np.concatenate([positions[a:b] for a, b in zip(left, right) if b > a]))
+
+        # A hash match is confirmed against the stored key before it is returned
+        stored = self.table.column(column).take(pa.array(rows, type=pa.int64()))
+        found = pc.is_in(stored, value_set=pa.array(keys, type=pa.string()))
+        rows = rows[found.to_numpy(zero_copy_only=False)]
+        return self._take(rows, columns, as_table)
+
+    def get(self, applicant_ids, columns=None, as_table=False):
+        return self.lookup("Applicant_id", applicant_ids, columns, as_table)
+
+    def by_ckyc_number(self, numbers, columns=None, as_table=False):
+        return self.lookup("CKYC Number", numbers, columns, as_table)
+
+    def scan(self, month=None, product=None, final_status=None, columns=None, limit=None, as_table=False):
+        mask = None
+        for arg, value in (("month", month), ("product", product), ("final_status", final_status)):
+            if value is None:
+                continue
+            # Only the filtered columns are read to build the mask
+            match = pc.equal(self.table.column(SCAN_FILTERS[arg]), pa.scalar(value, type=pa.string()))
+            match = pc.fill_null(match, False)
+            mask = match if mask is None else pc.and_(mask, match)
+        if mask is None:
+            rows = np.arange(len(self) if limit is None else min(limit, len(self)))
+        else:
+            rows = np.flatnonzero(mask.to_numpy(zero_copy_only=False))
+            if limit is not None:
+                rows = rows[:limit]
+        return self._take(rows, columns, as_table)
+
+    def close(self):
+        self.table = None
+        self._source.close()
+
+# ----------------------------------------------------------------------------
+# Local HTTP endpoint (JSON):
+#   GET  /applicants?id=1&id=2       GET /ckyc?number=...
+#   POST /applicants {"ids": [...]}  GET /scan?month=Jan'24&final_status=Pending&limit=100
+#   columns=a,b on any request limits the returned columns
+# ----------------------------------------------------------------------------
+def _json_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+class LookupHandler(BaseHTTPRequestHandler):
+    store = None
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, default=_json_value).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _answer(self, route, params, body=None):
+        columns = params.get("columns", [None])[0]
+        columns = columns.split(",") if columns else None
+        started = time.perf_counter()
+        if route == "/health":
+            return {"rows": len(self.store), **self.store.meta}
+        if route == "/applicants":
+            ids = (body or {}).get("ids") or params.get("id", [])
+            table = self.store.get(ids, columns, as_table=True)
+        elif route == "/ckyc":
+            numbers = (body or {}).get("numbers") or params.get("number", [])
+            table = self.store.by_ckyc_number(numbers, columns, as_table=True)
+        elif route == "/scan":
+            filters = {arg: params[arg][0] for arg in SCAN_FILTERS if arg in params}
+            limit = int(params["limit"][0]) if "limit" in params else None
+            table = self.store.scan(columns=columns, limit=limit, as_table=True, **filters)
+        else:
+            return None
+        return {"rows": table.num_rows, "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+                "records": table.to_pylist()}
+
+    def _handle(self, body=None):
+        url = urlparse(self.path)
+        try:
+            payload = self._answer(url.path, parse_qs(url.query), body)
+        except (ValueError, KeyError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        if payload is None:
+            self._send(404, {"error": f"Unknown endpoint {url.path}"})
+        else:
+            self._send(200, payload)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            self._send(400, {"error": f"Invalid JSON body: {e}"})
+            return
+        self._handle(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(store_dir, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    store = LookupStore(store_dir)
+    handler = type("BoundLookupHandler", (LookupHandler,), {"store": store})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"🔎 Serving {len(store):,} records from {store_dir} on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Lookup server stopped")
+    finally:
+        server.server_close()
+        store.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Point lookups over reconciled CKYC records")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build a lookup store from a pipeline output file")
+    build.add_argument("output", help="Pipeline output (.parquet/.csv/.xlsx)")
+    build.add_argument("store", help="Store directory")
+    query = sub.add_parser("get", help="Look up Applicant_ids")
+    query.add_argument("store")
+    query.add_argument("ids", nargs="+")
+    query.add_argument("--ckyc-number", action="store_true", help="The ids are CKYC Numbers")
+    http = sub.add_parser("serve", help="Serve the store over local HTTP")
+    http.add_argument("store")
+    http.add_argument("--host", default=DEFAULT_HOST)
+    http.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        rows = build_store_from_file(args.output, args.store)
+        print(f"✅ Lookup store {args.store}: {rows:,} records")
+    elif args.command == "get":
+        store = LookupStore(args.store)
+        result = store.by_ckyc_number(args.ids) if args.ckyc_number else store.get(args.ids)
+        print(result.to_string(index=False) if len(result) else "No matching records")
+        store.close()
+    else:
+        serve(args.store, args.host, args.port)
@@ -0,0 +1,88 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Versioned mapping tables; ops edit the JSON, not the code
+DEFAULT_MAPPINGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ckyc_mappings.json")
+SUPPORTED_VERSIONS = (1,)
+
+FINAL_STATUSES = ["Completed", "Pending", ""]
+
+# ----------------------------------------------------------------------------
+# Load and compile the mapping tables once per run
+# ----------------------------------------------------------------------------
+def load_mappings(path=DEFAULT_MAPPINGS_FILE):
+    with open(path, encoding="utf-8") as fh:
+        config = json.load(fh)
+
+    version = config.get("version")
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Unsupported mappings version {version!r} in {path}, expected one of {SUPPORTED_VERSIONS}")
+    for section in ["workflow_status_map", "completed_keywords", "pending_keywords", "product_map"]:
+        if section not in config:
+            raise ValueError(f"Mappings file {path} is missing '{section}'")
+
+    config["workflow_lookup"] = compile_workflow_lookup(config["workflow_status_map"])
+    config["final_lookup"] = compile_final_lookup(config["completed_keywords"], config["pending_keywords"])
+    return config
+
+def compile_workflow_lookup(workflow_status_map):
+    # Inverted table: workflow state -> CKYC Status
+    lookup = {}
+    for status, workflows in workflow_status_map.items():
+        for workflow in workflows:
+            if workflow in lookup and lookup[workflow] != status:
+                raise ValueError(f"Workflow '{workflow}' is mapped to both '{lookup[workflow]}' and '{status}'")
+            lookup[workflow] = status
+    return lookup
+
+def compile_final_lookup(completed_keywords, pending_keywords):
+    # Completed wins over Pending, as in the old if/elif
+    lookup = {kw.strip().lower(): "Pending" for kw in pending_keywords}
+    lookup.update({kw.strip().lower(): "Completed" for kw in completed_keywords})
+    return lookup
+
+# ----------------------------------------------------------------------------
+# Vectorized categorical lookup: each distinct value is resolved once
+# ----------------------------------------------------------------------------
+def lookup_categorical(values, lookup, categories, normalize=None, default=""):
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    positions = {cat: i for i, cat in enumerate(categories)}
+
+    def code_for(value):
+        key = normalize(value) if normalize else value
+        result = lookup.get(key, default)
+        return -1 if result is None else positions[result]
+
+    # One extra slot at the end for missing inputs (factorize code -1)
+    unique_codes = np.array([code_for(u) for u in uniques] + [code_for(np.nan)], dtype=np.int64)
+    result_codes = unique_codes[codes]
+    return pd.Series(pd.Categorical.from_codes(result_codes, categories=categories),
+                     index=values.index, name=values.name)
+
+def _strip_workflow(value):
+    return str(value).strip()
+
+def _fold_status(value):
+    return "" if pd.isna(value) else str(value).strip().lower()
+
+def _raw_product(value):
+    return None if pd.isna(value) else value
+
+def map_ckyc_status(workflow, mappings):
+    lookup = mappings.get("workflow_lookup") or compile_workflow_lookup(mappings["workflow_status_map"])
+    categories = list(mappings["workflow_status_map"]) + [""]
+    return lookup_categorical(workflow, lookup, categories, normalize=_strip_workflow)
+
+def determine_final_status(ckyc_status, mappings):
+    lookup = mappings.get("final_lookup") or compile_final_lookup(mappings["completed_keywords"],
+                                                                  mappings["pending_keywords"])
+    return lookup_categorical(ckyc_status, lookup, FINAL_STATUSES, normalize=_fold_status)
+
+def map_product_name(loan_product, mappings):
+    # Unknown Loan Product codes stay missing, as with Series.map(product_map)
+    product_map = mappings["product_map"]
+    categories = list(dict.fromkeys(product_map.values()))
+    return lookup_categorical(loan_product, product_map, categories, normalize=_raw_product, default=None)
@@ -0,0 +1,196 @@
+import os
+
+import pandas as pd
+
+from cube import CUBE_KEYS, TAT_COLUMNS, update_cube
+from dates import AUDIT_DATE_FORMATS, parse_date_columns
+from ingest_cache import read_many_cached
+from instrument import NO_INSTRUMENTATION
+from rules import PROFILES, computed_columns, evaluate
+from transforms import extract_applicant_id, normalize_ids, strip_strings
+from validate import failed_checks, validate
+from writers import select_columns, write_output
+
+# ----------------------------------------------------------------------------
+# Steps shared by app.py's batch, chunked and incremental runs and the watch
+# mode. Output paths come resolved on args (--cube, --exceptions, --history).
+# ----------------------------------------------------------------------------
+
+# Column rules of the default profile; see rules.PROFILES for the legacy variants
+date_cols = PROFILES["app"]["date_cols"]
+
+# Audit report column -> base column
+audit_columns = PROFILES["app"]["audit_columns"]
+
+# Columns this script writes into the base workbook
+derived_columns = PROFILES["app"]["outputs"]
+
+# 🔍 Dynamically detect files
+def find_file(keyword, directory):
+    for f in os.listdir(directory):
+        if keyword.lower() in f.lower() and f.lower().endswith('.xlsx'):
+            return os.path.join(directory, f)
+    return None
+
+# Every matching workbook (monthly / per-partner audit splits), in name order
+def find_files(keyword, directory):
+    return sorted(
+        os.path.join(directory, f) for f in os.listdir(directory)
+        if keyword.lower() in f.lower() and f.lower().endswith('.xlsx') and not f.startswith('~$')
+    )
+
+# Parse all audit reports in parallel and stack them in file order, so the
+# --duplicate-policy dedup on Applicant_id is deterministic across files
+def load_audit(audit_files, workers=None, rebuild=False):
+    frames = read_many_cached(audit_files, workers=workers, rebuild=rebuild)
+    for frame in frames:
+        frame.columns = frame.columns.str.strip()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+# ----------------------------------------------------------------------------
+# Clean columns, strings and Applicant IDs
+# ----------------------------------------------------------------------------
+def prepare_base(base_df):
+    base_df.columns = base_df.columns.str.strip()
+    base_df["Applicant_id"] = normalize_ids(base_df["Applicant_id"])
+    return base_df
+
+def prepare_audit(audit_df):
+    audit_df.columns = audit_df.columns.str.strip()
+    audit_df = strip_strings(audit_df)
+
+    if "Los App Id" in audit_df.columns:
+        audit_df["Applicant_id"] = extract_applicant_id(audit_df["Los App Id"])
+    else:
+        audit_df["Applicant_id"] = normalize_ids(audit_df["Applicant_id"])
+
+    # Audit dates are parsed once here, not once per joined base row
+    return parse_date_columns(audit_df, AUDIT_DATE_FORMATS)
+
+def prepare_inputs(base_df, audit_df):
+    return prepare_base(base_df), prepare_audit(audit_df)
+
+# ----------------------------------------------------------------------------
+# Derive every output column for the given base rows
+# ----------------------------------------------------------------------------
+def reconcile(base_df, audit_df, mappings, duplicate_policy="last", audit_index=None, run=NO_INSTRUMENTATION,
+              profile="app", targets=None):
+    # Only the requested columns (default: all of the profile's) and what they depend on are computed
+    return evaluate(base_df, audit_df, mappings, profile=profile, targets=targets, duplicate_policy=duplicate_policy,
+                    audit_index=audit_index, run=run)
+
+# Move 'Product Name' next to 'Partner Id'
+def place_product_name(base_df):
+    if "Partner Id" in base_df.columns and "Product Name" in base_df.columns:
+        cols = list(base_df.columns)
+        idx = cols.index("Partner Id") + 1
+        cols.insert(idx, cols.pop(cols.index("Product Name")))
+        base_df = base_df[cols]
+    return base_df
+
+def print_join_stats(join_stats):
+    print(f"🔗 Audit join: {join_stats['matched']} matched, {join_stats['missed']} missed "
+          f"({join_stats['duplicate_ids']} duplicate Applicant_id rows, policy={join_stats['policy']})")
+    if join_stats.get("unkeyed_rows"):
+        print(f"⚠️ {join_stats['unkeyed_rows']} audit row(s) without an Applicant_id were ignored")
+
+# Month x Product x Status TAT aggregates; only months whose rows changed are re-aggregated
+# (chunked runs pass the CubeSpill their chunks went to instead of a frame)
+def write_cube(df, args, run, spill=None):
+    cube_path = args.cube
+    needed = CUBE_KEYS + list(TAT_COLUMNS)
+    absent = spill.missing if spill is not None else [c for c in needed if c not in df.columns]
+    # An overwritten base workbook still holds the last run's outputs; those are not this run's
+    computed = computed_columns(args.rules, args.columns)
+    missing = [c for c in needed if c not in computed or c in absent]
+    if missing:
+        if spill is not None:
+            spill.discard()
+        print(f"ℹ️ TAT cube skipped: this run did not compute {', '.join(missing)}")
+        return
+    try:
+        with run.stage("cube", 0 if df is None else len(df)) as stage:
+            if spill is not None:
+                cube, changed = spill.finish(sla_days=args.sla_days, full=args.full)
+            else:
+                cube, changed = update_cube(df, cube_path, sla_days=args.sla_days, full=args.full)
+            stage.rows_out = len(cube)
+        print(f"📊 TAT cube: {len(cube)} rows, {len(changed)} month(s) refreshed -> {os.path.basename(cube_path)}")
+    except Exception as e:
+        print(f"❌ Failed to write TAT cube: {str(e)}")
+
+# Applicant_id / CKYC Number point lookups, served by lookup.py
+def write_lookup_store(df, store_dir, run):
+    from lookup import build_store
+
+    try:
+        with run.stage("lookup store", len(df)):
+            rows = build_store(df, store_dir)
+        print(f"🔎 Lookup store: {rows} records -> {store_dir}")
+    except Exception as e:
+        print(f"❌ Failed to build lookup store: {str(e)}")
+
+# Data-quality checks; returns the checks that should fail the run (--fail-on).
+# Chunked runs pass the Validator their chunks went to instead of a frame.
+def write_exceptions(df, mappings, args, run, validator=None):
+    exceptions_path = args.exceptions
+    computed = computed_columns(args.rules, args.columns)
+    try:
+        if validator is None:
+            with run.stage("validate", len(df)) as stage:
+                summary, exceptions, skipped = validate(df, mappings, computed=computed)
+                stage.rows_out = len(exceptions)
+        else:
+            summary, skipped = validator.summary(), validator.skipped or []
+    except Exception as e:
+        print(f"❌ Data-quality checks could not run: {str(e)}")
+        # With --fail-on a run that was never checked must not pass as clean
+        return [] if args.fail_on is None else ["validate"]
+    try:
+        if validator is None:
+            # Written even when clean, so an old report never outlives its problems
+            with run.stage("exceptions report", len(exceptions)):
+                write_output(exceptions, exceptions_path)
+        else:
+            with run.stage("exceptions report", validator.exceptions):
+                validator.close()
+    except Exception as e:
+        print(f"❌ Failed to write exceptions report: {str(e)}")
+    total = int(summary["Rows"].sum())
+    flagged = summary[summary["Rows"] > 0]
+    if flagged.empty:
+        print("🧪 Data-quality checks: no exceptions")
+    else:
+        print(f"🧪 Data-quality checks: {total} exception(s) -> {os.path.basename(exceptions_path)}")
+        for check in flagged.itertuples(index=False):
+            print(f" - {check.Check}: {check.Rows} row(s), e.g. {check.Sample}")
+    if skipped and args.columns:
+        print(f"ℹ️ Not checked (columns not computed): {', '.join(skipped)}")
+    return failed_checks(summary, args.fail_on)
+
+# Run snapshot for trend queries, partitioned by month and run date (see history.py)
+def write_history(df, args, outputs, run, writer=None):
+    from history import HistoryWriter, compact
+
+    store_dir = args.history
+    try:
+        # Chunked runs already timed their writes; only compaction is left here
+        with run.stage("history", 0 if df is None else len(df)):
+            if writer is None:
+                writer = HistoryWriter(store_dir)
+                writer.write(select_columns(df, "derived", outputs))
+            compacted = compact(store_dir)
+        print(f"🗄️ History: {writer.rows} rows in {len(writer.months)} month partition(s) for {writer.run_date}"
+              + (f", {compacted} old partition(s) compacted" if compacted else ""))
+    except Exception as e:
+        print(f"❌ Failed to update history store: {str(e)}")
+
+def finish_run(run, run_log):
+    run.print_summary()
+    try:
+        run.write_log(run_log)
+    except OSError as e:
+        print(f"⚠️ Could not write run log {run_log}: {str(e)}")
+    run.close()
@@ -0,0 +1,190 @@
+import pandas as pd
+
+from dates import AUDIT_DATE_FORMATS, BASE_DATE_FORMATS, parse_date_column
+from instrument import NO_INSTRUMENTATION
+from mappings import FINAL_STATUSES, compile_final_lookup, compile_workflow_lookup
+from rules import PROFILES
+from transforms import as_text
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+BACKENDS = ("pandas", "polars")
+
+def _require_polars():
+    if pl is None:
+        raise ValueError("The polars backend needs the 'polars' package (pip install polars)")
+
+# ----------------------------------------------------------------------------
+# Inputs: only the columns the rules read go to Polars, so untouched base
+# columns (often mixed-type Excel data) never need converting
+# ----------------------------------------------------------------------------
+def _date_inputs(df, formats):
+    # Text dates go through the same unique-value parser as the pandas path, so
+    # both backends agree on ambiguous strings; real dates are passed as they are
+    dates = {}
+    for col, fmt in formats.items():
+        if col in df.columns:
+            values = df[col]
+            if not pd.api.types.is_datetime64_any_dtype(values.dtype):
+                values = parse_date_column(values, fmt)
+            dates[col] = values.astype("datetime64[ns]")
+    return dates
+
+def _frame(df, columns, dates):
+    data = {}
+    for col in columns:
+        if col in dates:
+            data[col] = dates[col]
+        elif col in df.columns:
+            values = df[col]
+            # Mixed object columns become text, as normalize_ids/strip_strings would see them
+            if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) != "string":
+                values = as_text(values)
+            data[col] = values
+    return pl.from_pandas(pd.DataFrame(data, index=df.index).reset_index(drop=True))
+
+def _ids(expr, dtype):
+    # normalize_ids: text, stripped, float ids lose ".0", blanks are missing
+    if dtype.is_float():
+        text = pl.when(expr == expr.floor()).then(expr.cast(pl.Int64).cast(pl.Utf8)).otherwise(expr.cast(pl.Utf8))
+    else:
+        text = expr.cast(pl.Utf8).str.strip_chars()
+    return pl.when(text == "").then(None).otherwise(text)
+
+def _id_length(expr, dtype):
+    # id_length: digits of the number, a trailing ".0" from a float read is not counted
+    if dtype.is_float():
+        text = pl.when(expr == expr.floor()).then(expr.cast(pl.Int64).cast(pl.Utf8)).otherwise(expr.cast(pl.Utf8))
+    else:
+        text = expr.cast(pl.Utf8).str.replace(r"\.0$", "")
+    return text.str.len_chars().cast(pl.Int64)
+
+def _text(expr, dtype):
+    return expr.str.strip_chars() if dtype == pl.Utf8 else expr
+
+def _left_join(left, right, on):
+    # Missing keys never match (the audit side has none left by now)
+    return left.join(right, on=on, how="left")
+
+# ----------------------------------------------------------------------------
+# One lazy query plan for clean + reconcile; Polars runs it on all cores
+# ----------------------------------------------------------------------------
+def build_plan(base, audit, mappings, duplicate_policy="last"):
+    profile = PROFILES["app"]
+    date_cols = [c for c in profile["date_cols"] if c in base.columns]
+    audit_columns = {src: dst for src, dst in profile["audit_columns"].items() if src in audit.columns}
+
+    base_lf = base.lazy().with_row_index("_row").with_columns(
+        _ids(pl.col("Applicant_id"), base.schema["Applicant_id"]).alias("Applicant_id"),
+        *[pl.col(c).dt.truncate("1d").alias(c) for c in date_cols],
+    )
+
+    if "Los App Id" in audit.columns:
+        los = _text(pl.col("Los App Id").cast(pl.Utf8), pl.Utf8)
+        key = los.str.extract(r"_(\d+)$", 1)
+    else:
+        key = _ids(pl.col("Applicant_id"), audit.schema["Applicant_id"])
+    audit_lf = audit.lazy().with_row_index("_audit_row").with_columns(
+        key.alias("Applicant_id"),
+        *[_text(pl.col(src), audit.schema[src]).alias(src) for src in audit_columns
+          if src not in AUDIT_DATE_FORMATS],
+        *[pl.col(src).dt.truncate("1d").alias(src) for src in audit_columns if src in AUDIT_DATE_FORMATS],
+    )
+
+    # Same duplicate rule as dedupe_audit
+    if duplicate_policy == "latest" and "Triggered Date" in audit.columns:
+        audit_lf = audit_lf.sort(["Triggered Date", "_audit_row"], nulls_last=False, maintain_order=True)
+    # Same as build_audit_index: unkeyed audit rows never join
+    audit_lf = audit_lf.filter(pl.col("Applicant_id").is_not_null())
+    keep = "first" if duplicate_policy == "first" else "last"
+    unique_audit = audit_lf.unique(subset="Applicant_id", keep=keep, maintain_order=True).select(
+        pl.col("Applicant_id"),
+        *[pl.col(src).alias(dst) for src, dst in audit_columns.items()],
+        pl.lit(True).alias("_matched"),
+    )
+    unique_count = unique_audit.select(pl.len().alias("unique_ids")).join(
+        audit_lf.select(pl.len().alias("keyed_rows")), how="cross")
+
+    workflow_lookup = compile_workflow_lookup(mappings["workflow_status_map"])
+    final_lookup = compile_final_lookup(mappings["completed_keywords"], mappings["pending_keywords"])
+    disbursed = pl.coalesce([pl.col(c) for c in date_cols]) if date_cols else pl.lit(None, pl.Datetime("ns"))
+
+    plan = _left_join(base_lf, unique_audit, "Applicant_id").sort("_row").with_columns(
+        disbursed.alias("Approved/Disbursed Date"),
+    ).with_columns(
+        pl.col("Approved/Disbursed Date").dt.strftime("%b'%y").alias("Month"),
+        pl.col("Workflow").cast(pl.Utf8).str.strip_chars()
+          .replace_strict(workflow_lookup, default="", return_dtype=pl.Utf8).fill_null("").alias("CKYC Status"),
+    ).with_columns(
+        pl.col("CKYC Status").str.strip_chars().str.to_lowercase()
+          .replace_strict(final_lookup, default="", return_dtype=pl.Utf8).alias("Final Status"),
+        (pl.col("CKYC Upload Date") - pl.col("Approved/Disbursed Date")).dt.total_days().alias("CKYC Reporting TAT"),
+        (pl.col("InwardDate") - pl.col("Approved/Disbursed Date")).dt.total_days().alias("CKYC Trigger TAT"),
+        _id_length(pl.col("CKYC Number"), unique_audit.collect_schema()["CKYC Number"]).alias("CKYC ID Length"),
+        pl.col("Loan Product").cast(pl.Utf8)
+          .replace_strict(mappings["product_map"], default=None, return_dtype=pl.Utf8).alias("Product Name"),
+    )
+    return plan, unique_count, date_cols
+
+# ----------------------------------------------------------------------------
+# Drop-in for prepare_inputs + reconcile on the app profile
+# ----------------------------------------------------------------------------
+def reconcile_polars(base_df, audit_df, mappings, duplicate_policy="last", run=NO_INSTRUMENTATION):
+    _require_polars()
+    profile = PROFILES["app"]
+    base_df.columns = base_df.columns.str.strip()
+    audit_df.columns = audit_df.columns.str.strip()
+    rows = len(base_df)
+
+    with run.stage("polars inputs", rows + len(audit_df)):
+        base_cols = ["Applicant_id", "Loan Product"] + profile["date_cols"]
+        audit_cols = ["Los App Id", "Applicant_id"] + list(profile["audit_columns"])
+        base_dates = {col: BASE_DATE_FORMATS.get(col) for col in profile["date_cols"]}
+        base = _frame(base_df, base_cols, _date_inputs(base_df, base_dates))
+        audit = _frame(audit_df, audit_cols, _date_inputs(audit_df, AUDIT_DATE_FORMATS))
+
+    with run.stage("polars plan", rows) as stage:
+        plan, unique_count, date_cols = build_plan(base, audit, mappings, duplicate_policy)
+        result, counts = pl.collect_all([plan, unique_count])
+        matched = int(result["_matched"].sum() or 0)
+        stage.rows_out = matched
+
+    with run.stage("polars output", rows):
+        out = result.to_pandas()
+        out.index = base_df.index
+        base_df["Applicant_id"] = as_text(out["Applicant_id"])
+        for col in date_cols + ["Approved/Disbursed Date"]:
+            base_df[col] = out[col].astype("datetime64[ns]")
+        base_df["Month"] = as_text(out["Month"])
+        # Same dtypes the pandas rules produce
+        workflow = out["Workflow"]
+        base_df["Workflow"] = as_text(workflow).astype("category")
+        base_df["CKYC Status"] = pd.Categorical(out["CKYC Status"],
+                                                categories=list(mappings["workflow_status_map"]) + [""])
+        base_df["Final Status"] = pd.Categorical(out["Final Status"], categories=FINAL_STATUSES)
+        for col in ["InwardDate", "Completion Date"]:
+            base_df[col] = out[col].astype("datetime64[ns]")
+        number = out["CKYC Number"]
+        base_df["CKYC Number"] = number.astype("float64") if pd.api.types.is_numeric_dtype(number.dtype) else number
+        base_df["CKYC Upload Date"] = out["CKYC Upload Date"].astype("datetime64[ns]")
+        for col in ["CKYC Reporting TAT", "CKYC Trigger TAT"]:
+            base_df[col] = out[col].astype("float64")
+        base_df["CKYC ID Length"] = out["CKYC ID Length"].astype("Int64")
+        base_df["Product Name"] = pd.Categorical(out["Product Name"],
+                                                 categories=list(dict.fromkeys(mappings["product_map"].values())))
+
+    audit_rows = len(audit_df)
+    join_stats = {
+        "base_rows": rows,
+        "matched": matched,
+        "missed": rows - matched,
+        "audit_rows": audit_rows,
+        "duplicate_ids": int(counts["keyed_rows"][0] - counts["unique_ids"][0]),
+        "unkeyed_rows": int(audit_rows - counts["keyed_rows"][0]),
+        "policy": duplicate_policy,
+        "columns": list(profile["audit_columns"].values()),
+    }
+    return base_df, join_stats
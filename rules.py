@@ -0,0 +1,210 @@
+from audit_join import join_audit
+from dates import BASE_DATE_FORMATS, days_between, parse_date_column
+from instrument import NO_INSTRUMENTATION
+from mappings import determine_final_status, map_ckyc_status, map_product_name
+from transforms import coalesce_first, id_length
+
+# ----------------------------------------------------------------------------
+# Profiles: the rule variants of app.py and the legacy oldapp.py / test.py
+# scripts (the two legacy scripts apply the same rules)
+# ----------------------------------------------------------------------------
+_LEGACY = {
+    "date_cols": ["App Form DisbursalDate", "Appform Approval Date", "Appform Posting Date"],
+    "month_format": "%b",
+    "audit_columns": {
+        "CKYC Status": "Status.1",
+        "Status": "Workflow",
+        "Triggered Date": "InwardDate",
+        "CKYC Completion Date": "Completion Date",
+        "CKYC Number": "CKYC Number",
+    },
+    # Final Status read straight from the audit's CKYC Status (Status.1),
+    # with the keyword lists the legacy scripts hard-coded
+    "status_source": "Status.1",
+    "final_keywords": {
+        "completed_keywords": ["ckyc completed", "ckyc completed - manual", "issue with ckyc"],
+        "pending_keywords": ["auto resolution", "ckyc upload pending", "pending with ckyc team", "under resolution"],
+    },
+    "outputs": [
+        "Approved/Disbursed Date", "Month", "Status.1", "Workflow", "Final Status", "InwardDate",
+        "Completion Date", "CKYC Number", "Aging", "TAT", "CKYC ID Length",
+    ],
+}
+
+PROFILES = {
+    "app": {
+        "date_cols": ["App Form DisbursalDate", "Appform Approval Date", "Recent Status Date"],
+        "month_format": "%b'%y",
+        "audit_columns": {
+            "Status": "Workflow",
+            "Triggered Date": "InwardDate",
+            "CKYC Completion Date": "Completion Date",
+            "CKYC Number": "CKYC Number",
+            "First Batch Upload Date": "CKYC Upload Date",
+        },
+        # Final Status from the Workflow-derived CKYC Status
+        "status_source": "CKYC Status",
+        "outputs": [
+            "Approved/Disbursed Date", "Month", "Workflow", "CKYC Status", "Final Status", "InwardDate",
+            "Completion Date", "CKYC Number", "CKYC Upload Date", "CKYC Reporting TAT", "CKYC Trigger TAT",
+            "CKYC ID Length", "Product Name",
+        ],
+    },
+    "oldapp": _LEGACY,
+    "test": _LEGACY,
+}
+
+# ----------------------------------------------------------------------------
+# Rules: one named output, the names it reads, and the stage it is timed under.
+# Names starting with "_" are shared intermediates, not output columns.
+# ----------------------------------------------------------------------------
+class Rule:
+    def __init__(self, name, inputs, func, stage):
+        self.name = name
+        self.inputs = inputs
+        self.func = func
+        self.stage = stage
+
+class Context:
+    def __init__(self, base_df, audit_df, mappings, profile, duplicate_policy, audit_index):
+        self.base_df = base_df
+        self.audit_df = audit_df
+        self.mappings = mappings
+        self.profile = profile
+        self.duplicate_policy = duplicate_policy
+        self.audit_index = audit_index
+        self.values = {}
+
+    def __getitem__(self, name):
+        if name in self.values:
+            return self.values[name]
+        if name not in self.base_df.columns:
+            raise ValueError(f"'{name}' is not available: neither the base data nor the audit report has it")
+        return self.base_df[name]
+
+def _parse_date(col):
+    def parse(ctx):
+        if col in ctx.base_df.columns:
+            return parse_date_column(ctx.base_df[col], BASE_DATE_FORMATS.get(col))
+        return None
+    return parse
+
+def _audit_column(col, category=False):
+    # Columns the audit report does not have are left out, as before
+    def take(ctx):
+        joined = ctx["_audit"][0]
+        if col not in joined:
+            return None
+        return joined[col].astype("category") if category else joined[col]
+    return take
+
+def _join(ctx):
+    joined, stats = join_audit(ctx.base_df, ctx.audit_df, ctx.profile["audit_columns"],
+                               policy=ctx.duplicate_policy, audit_index=ctx.audit_index)
+    return joined, stats
+
+def _final_status(ctx):
+    # Profiles without their own keyword lists use the mappings file
+    mappings = ctx.profile.get("final_keywords") or ctx.mappings
+    return determine_final_status(ctx[ctx.profile["status_source"]], mappings)
+
+def _days(later, earlier):
+    return lambda ctx: days_between(ctx[later], ctx[earlier])
+
+def profile_rules(profile):
+    date_cols = profile["date_cols"]
+    rules = [Rule(col, [], _parse_date(col), "disbursed date") for col in date_cols]
+    rules += [
+        Rule("Approved/Disbursed Date", date_cols,
+             lambda ctx: coalesce_first(ctx.base_df, date_cols), "disbursed date"),
+        Rule("Month", ["Approved/Disbursed Date"],
+             lambda ctx: ctx["Approved/Disbursed Date"].dt.strftime(ctx.profile["month_format"]), "month"),
+        Rule("_audit", [], _join, "audit join"),
+    ]
+
+    audit_targets = list(profile["audit_columns"].values())
+    for col in ["Status.1", "Workflow"]:
+        if col in audit_targets:
+            rules.append(Rule(col, ["_audit"], _audit_column(col, category=col == "Workflow"), "status mapping"))
+    rules += [
+        Rule("CKYC Status", ["Workflow"], lambda ctx: map_ckyc_status(ctx["Workflow"], ctx.mappings), "status mapping"),
+        Rule("Final Status", [profile["status_source"]], _final_status, "status mapping"),
+    ]
+    for col in ["InwardDate", "Completion Date", "CKYC Number", "CKYC Upload Date"]:
+        if col in audit_targets:
+            rules.append(Rule(col, ["_audit"], _audit_column(col), "audit dates"))
+    rules += [
+        # CKYC Reporting TAT = CKYC Upload Date - Disbursed Date
+        Rule("CKYC Reporting TAT", ["CKYC Upload Date", "Approved/Disbursed Date"],
+             _days("CKYC Upload Date", "Approved/Disbursed Date"), "tats"),
+        # CKYC Trigger TAT = InwardDate - Disbursed Date
+        Rule("CKYC Trigger TAT", ["InwardDate", "Approved/Disbursed Date"],
+             _days("InwardDate", "Approved/Disbursed Date"), "tats"),
+        # Legacy Aging = Disbursed Date - Completion Date, TAT = InwardDate - Disbursed Date
+        Rule("Aging", ["Approved/Disbursed Date", "Completion Date"],
+             _days("Approved/Disbursed Date", "Completion Date"), "tats"),
+        Rule("TAT", ["InwardDate", "Approved/Disbursed Date"], _days("InwardDate", "Approved/Disbursed Date"), "tats"),
+        Rule("CKYC ID Length", ["CKYC Number"], lambda ctx: id_length(ctx["CKYC Number"]), "id length"),
+        Rule("Product Name", [], lambda ctx: map_product_name(ctx.base_df["Loan Product"], ctx.mappings),
+             "product map"),
+    ]
+    return rules
+
+# ----------------------------------------------------------------------------
+# Planner: the requested outputs plus everything they depend on, in rule order
+# ----------------------------------------------------------------------------
+def plan(profile, targets=None):
+    rules = {rule.name: rule for rule in profile_rules(profile)}
+    targets = profile["outputs"] if targets is None else targets
+    unknown = [t for t in targets if t not in rules]
+    if unknown:
+        raise ValueError(f"Unknown column(s) {unknown}, expected some of {list(rules)}")
+
+    needed = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name in needed or name not in rules:
+            # Names without a rule are source columns of the base data
+            continue
+        needed.add(name)
+        pending.extend(rules[name].inputs)
+    return [rule for rule in rules.values() if rule.name in needed]
+
+def computed_columns(profile, targets=None):
+    # Derived columns a run writes: the requested ones and their dependencies
+    profile = PROFILES[profile] if isinstance(profile, str) else profile
+    return [rule.name for rule in plan(profile, targets)
+            if not rule.name.startswith("_") and rule.name not in profile["date_cols"]]
+
+# Every column some profile derives; an overwritten base workbook can hold them from an earlier run
+DERIVED_COLUMNS = sorted({col for name in PROFILES for col in computed_columns(name)})
+
+def evaluate(base_df, audit_df, mappings, profile="app", targets=None, duplicate_policy="last", audit_index=None,
+             run=NO_INSTRUMENTATION):
+    profile = PROFILES[profile] if isinstance(profile, str) else profile
+    steps = plan(profile, targets)
+    ctx = Context(base_df, audit_df, mappings, profile, duplicate_policy, audit_index)
+    rows = len(base_df)
+
+    # Consecutive rules of one stage are timed together
+    groups = []
+    for rule in steps:
+        if groups and groups[-1][0] == rule.stage:
+            groups[-1][1].append(rule)
+        else:
+            groups.append((rule.stage, [rule]))
+
+    join_stats = None
+    for stage_name, group in groups:
+        with run.stage(stage_name, rows) as stage:
+            for rule in group:
+                value = rule.func(ctx)
+                if rule.name.startswith("_"):
+                    ctx.values[rule.name] = value
+                elif value is not None:
+                    base_df[rule.name] = value
+            if "_audit" in ctx.values and join_stats is None:
+                join_stats = ctx.values["_audit"][1]
+                stage.rows_out = join_stats["matched"]
+    return base_df, join_stats
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+from pipeline import date_cols
+from mappings import load_mappings
+
+# Values the real exports contain that no mapping knows about
+UNKNOWN_WORKFLOWS = ["pending_review", "unknown_state"]
+UNKNOWN_PRODUCTS = ["XYZ", "TMP"]
+
+# ----------------------------------------------------------------------------
+# Synthetic CKYC base data: date_cols with nulls, Loan Product codes, repeats
+# ----------------------------------------------------------------------------
+def _random_dates(rng, rows, null_share, start="2023-04-01", span_days=730):
+    values = pd.Series(np.datetime64(start) + rng.integers(0, span_days, rows).astype("timedelta64[D]"))
+    values[rng.random(rows) < null_share] = pd.NaT
+    return values
+
+def make_base(rows, seed=0, mappings=None, duplicate_share=0.01):
+    rng = np.random.default_rng(seed)
+    mappings = mappings or load_mappings()
+    products = list(mappings["product_map"]) + UNKNOWN_PRODUCTS
+
+    applicant_ids = rng.choice(np.arange(10_000_000, 10_000_000 + rows * 4), size=rows, replace=False)
+    # A few applicants appear twice in the base, as in the monthly workbook
+    repeats = rng.random(rows) < duplicate_share
+    applicant_ids[repeats] = rng.choice(applicant_ids, size=int(repeats.sum()))
+
+    base = pd.DataFrame({
+        "Applicant_id": applicant_ids,
+        "Partner Id": rng.integers(1, 400, rows),
+        "Loan Product": rng.choice(products, rows, p=_weights(rng, len(products))),
+        "Branch": rng.choice(["Mumbai", "Delhi", "Chennai", "Pune", None], rows),
+        "Loan Amount": rng.integers(5_000, 5_000_000, rows).astype(float),
+    })
+    for col, null_share in zip(date_cols, [0.35, 0.3, 0.05]):
+        base[col] = _random_dates(rng, rows, null_share)
+    return base
+
+# ----------------------------------------------------------------------------
+# Synthetic audit report: "Los App Id" with a _<digits> suffix, padded strings,
+# workflow statuses from the mapping config, duplicate Applicant_ids
+# ----------------------------------------------------------------------------
+def make_audit(base, coverage=0.8, duplicate_share=0.05, seed=1, mappings=None):
+    rng = np.random.default_rng(seed)
+    mappings = mappings or load_mappings()
+    workflows = [w for ws in mappings["workflow_status_map"].values() for w in ws] + UNKNOWN_WORKFLOWS
+
+    ids = pd.Series(base["Applicant_id"].unique())
+    ids = ids[rng.random(len(ids)) < coverage].to_numpy()
+    dupes = rng.choice(ids, size=int(len(ids) * duplicate_share)) if len(ids) else ids
+    ids = np.concatenate([ids, dupes])
+    rows = len(ids)
+
+    prefixes = rng.choice(["LOS", "APP", "LOS_NEW", "PL"], rows)
+    los_ids = pd.Series(prefixes).str.cat(pd.Series(ids.astype(str)), sep="_")
+    # Some exports carry stray whitespace and a handful of malformed ids
+    padded = rng.random(rows) < 0.1
+    los_ids[padded] = " " + los_ids[padded] + " "
+    los_ids[rng.random(rows) < 0.002] = "MANUAL-ENTRY"
+
+    statuses = pd.Series(rng.choice(workflows, rows))
+    padded = rng.random(rows) < 0.05
+    statuses[padded] = " " + statuses[padded] + " "
+    statuses[rng.random(rows) < 0.02] = None
+
+    triggered = _random_dates(rng, rows, 0.1, start="2023-05-01")
+    lag = pd.to_timedelta(rng.integers(0, 60, rows), unit="D")
+    ckyc_numbers = pd.Series(rng.integers(10**13, 10**14, rows).astype(float))
+    ckyc_numbers[rng.random(rows) < 0.4] = np.nan
+
+    audit = pd.DataFrame({
+        "Los App Id": los_ids,
+        "Status": statuses,
+        "Triggered Date": triggered,
+        "CKYC Completion Date": (triggered + lag).where(rng.random(rows) < 0.6),
+        "CKYC Number": ckyc_numbers,
+        "First Batch Upload Date": (triggered + lag / 2).where(rng.random(rows) < 0.7),
+        "Partner Name": rng.choice(["Alpha Fin ", "Beta Credit", " Gamma"], rows),
+        "Remarks": rng.choice(["", "retry", "  manual check  ", None], rows),
+    })
+    # Shuffle so duplicates are not all at the end
+    return audit.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+def _weights(rng, n):
+    weights = rng.random(n) + 0.05
+    return weights / weights.sum()
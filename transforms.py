@@ -0,0 +1,66 @@
+import pandas as pd
+
+# ----------------------------------------------------------------------------
+# First non-null coalesce over an ordered list of columns
+# ----------------------------------------------------------------------------
+def coalesce_first(df, cols):
+    # Columns missing from the frame are skipped, like row.get() did
+    present = [col for col in cols if col in df.columns]
+    if not present:
+        return pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+
+    result = df[present[0]].copy()
+    for col in present[1:]:
+        missing = result.isna()
+        if not missing.any():
+            break
+        result = result.mask(missing, df[col])
+    return result
+
+# ----------------------------------------------------------------------------
+# Text with missing values kept missing: pandas 3's "str" dtype keeps NaN, but
+# pandas 2 turns NaN/None into the strings "nan"/"None"
+# ----------------------------------------------------------------------------
+def as_text(values):
+    return values.astype("str").where(values.notna())
+
+# ----------------------------------------------------------------------------
+# Length of an ID that may have been read as a float (12345678901234.0)
+# ----------------------------------------------------------------------------
+def id_length(ids):
+    text = ids.astype(str).str.replace(r"\.0$", "", regex=True)
+    return text.str.len().where(ids.notna()).astype("Int64")
+
+# ----------------------------------------------------------------------------
+# Strip whitespace in text columns only, with vectorized string kernels.
+# Numeric and date columns are never touched; mixed object columns keep their
+# non-text cells as they are.
+# ----------------------------------------------------------------------------
+def strip_strings(df):
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_string_dtype(values.dtype) and values.dtype != object:
+            df[col] = values.str.strip()
+        elif values.dtype == object:
+            inferred = pd.api.types.infer_dtype(values, skipna=True)
+            if inferred == "string":
+                df[col] = as_text(values).str.strip()
+            elif inferred.startswith("mixed"):
+                text = values.map(lambda v: isinstance(v, str), na_action="ignore").fillna(False).astype(bool)
+                if text.any():
+                    df[col] = values.mask(text, values[text].str.strip())
+    return df
+
+# ----------------------------------------------------------------------------
+# One key type for Applicant_id: stripped strings, missing stays missing
+# ----------------------------------------------------------------------------
+def normalize_ids(ids):
+    text = as_text(ids).str.strip()
+    if pd.api.types.is_float_dtype(ids.dtype):
+        # A numeric id column with blanks is read as float: 123.0 keys as "123"
+        text = text.str.replace(r"\.0$", "", regex=True)
+    return text.mask(text == "")
+
+def extract_applicant_id(los_app_ids):
+    # "LOS_NEW_12345" -> "12345"; ids without a _<digits> suffix become missing
+    return as_text(los_app_ids).str.extract(r"_(\d+)$", expand=False)
@@ -0,0 +1,183 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from mappings import compile_workflow_lookup
+from rules import DERIVED_COLUMNS
+from transforms import as_text
+
+# CKYC numbers are 14 digits
+CKYC_ID_LENGTH = 14
+# Offending Applicant_ids shown per check in the printed summary
+SAMPLE_IDS = 5
+
+def default_exceptions_path(folder):
+    # CSV: an exception list can be as long as the base, and openpyxl is slow to write
+    return os.path.join(folder, "ckyc_exceptions.csv")
+
+# ----------------------------------------------------------------------------
+# Checks: a name, the columns it reads, a vectorized row mask (True = bad row)
+# and the column whose value is reported. A check whose columns a run did not
+# produce (legacy profile, --columns) is skipped, not failed; derived columns
+# count only when this run computed them, not when an old output left them.
+# ----------------------------------------------------------------------------
+class Check:
+    def __init__(self, name, inputs, func, value):
+        self.name = name
+        self.inputs = inputs
+        self.func = func
+        self.value = value
+
+def _unknown(values, known, normalize=None):
+    # Each distinct value is looked up once; missing values are never unknown
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    keys = [normalize(u) if normalize else u for u in uniques]
+    bad = np.array([key not in known for key in keys] + [False], dtype=bool)
+    return bad[codes]
+
+def _negative(col):
+    return lambda df, ctx: (df[col] < 0).fillna(False).to_numpy(dtype=bool)
+
+def _id_length(df, ctx):
+    length = df["CKYC ID Length"]
+    return (length.notna() & (length != CKYC_ID_LENGTH)).to_numpy(dtype=bool)
+
+def _completion_before_disbursal(df, ctx):
+    return (df["Completion Date"] < df["Approved/Disbursed Date"]).fillna(False).to_numpy(dtype=bool)
+
+def _unmapped_workflow(df, ctx):
+    # The rows map_ckyc_status silently turns into ""
+    mappings = ctx.mappings
+    lookup = mappings.get("workflow_lookup") or compile_workflow_lookup(mappings["workflow_status_map"])
+    return _unknown(df["Workflow"], lookup, normalize=lambda value: str(value).strip())
+
+def _unknown_product(df, ctx):
+    # The rows map_product_name leaves without a Product Name
+    return _unknown(df["Loan Product"], ctx.mappings["product_map"])
+
+def _duplicate_id(df, ctx):
+    # Repeats within this frame, plus ids already seen in earlier chunks
+    ids = df["Applicant_id"]
+    present = ids.notna().to_numpy()
+    codes, uniques = pd.factorize(ids, use_na_sentinel=True)
+    earlier = np.array([u in ctx.seen_ids for u in uniques] + [False], dtype=bool)
+    mask = present & (ids.duplicated(keep=False).to_numpy() | earlier[codes])
+
+    # An earlier chunk's single occurrence was not flagged back then; report it now
+    ctx.late_duplicates = [u for u, hit in zip(uniques, earlier) if hit and u not in ctx.flagged_ids]
+    ctx.flagged_ids.update(uniques[np.unique(codes[mask])] if mask.any() else [])
+    ctx.seen_ids.update(uniques)
+    return mask
+
+CHECKS = [
+    Check("ckyc-id-length", ["CKYC ID Length"], _id_length, "CKYC Number"),
+    Check("negative-reporting-tat", ["CKYC Reporting TAT"], _negative("CKYC Reporting TAT"), "CKYC Reporting TAT"),
+    Check("negative-trigger-tat", ["CKYC Trigger TAT"], _negative("CKYC Trigger TAT"), "CKYC Trigger TAT"),
+    Check("negative-tat", ["TAT"], _negative("TAT"), "TAT"),
+    Check("completion-before-disbursal", ["Completion Date", "Approved/Disbursed Date"],
+          _completion_before_disbursal, "Completion Date"),
+    Check("unmapped-workflow", ["Workflow"], _unmapped_workflow, "Workflow"),
+    Check("unknown-loan-product", ["Loan Product"], _unknown_product, "Loan Product"),
+    Check("duplicate-applicant-id", ["Applicant_id"], _duplicate_id, "Applicant_id"),
+]
+DUPLICATE_CHECK = "duplicate-applicant-id"
+CHECK_NAMES = [check.name for check in CHECKS]
+
+# ----------------------------------------------------------------------------
+# One pass per frame: every check's mask side by side, then a single long
+# exceptions table (one row per offending row and check). A chunked run feeds
+# each chunk to the same Validator; only the Applicant_ids seen so far are
+# kept between chunks, for the duplicate check.
+# ----------------------------------------------------------------------------
+def _empty_exceptions():
+    return pd.DataFrame({"Check": [], "Applicant_id": pd.Series([], dtype="str"), "Value": pd.Series([], dtype="str")})
+
+class Validator:
+    name = "validate"
+
+    def __init__(self, mappings, checks=None, sink=None, computed=None):
+        self.mappings = mappings
+        self.checks = CHECKS if checks is None else checks
+        self.sink = sink
+        # None: trust every column the frame has
+        self.computed = computed
+        self.rows = 0
+        self.exceptions = 0
+        self.skipped = None
+        self.counts = {}
+        self.samples = {}
+        self.seen_ids = set()
+        self.flagged_ids = set()
+        self.late_duplicates = []
+
+    def _available(self, df, col):
+        if col not in df.columns:
+            return False
+        return self.computed is None or col not in DERIVED_COLUMNS or col in self.computed
+
+    def add(self, df):
+        active = [check for check in self.checks
+                  if all(self._available(df, col) for col in check.inputs + [check.value])]
+        if self.skipped is None:
+            self.skipped = [check.name for check in self.checks if check not in active]
+
+        masks = np.zeros((len(df), len(active)), dtype=bool)
+        for i, check in enumerate(active):
+            masks[:, i] = check.func(df, self)
+
+        ids = df["Applicant_id"] if "Applicant_id" in df.columns else pd.Series(None, index=df.index, dtype="str")
+        hits = [np.flatnonzero(masks[:, i]) for i in range(len(active))]
+        # Only offending rows are converted to text for the report
+        parts = []
+        for check, h in zip(active, hits):
+            part = pd.DataFrame({
+                "Check": check.name,
+                "Applicant_id": ids.iloc[h].reset_index(drop=True),
+                "Value": as_text(df[check.value].iloc[h]).reset_index(drop=True),
+            })
+            if check.name == DUPLICATE_CHECK and self.late_duplicates:
+                late = pd.Series(self.late_duplicates, dtype=ids.dtype)
+                part = pd.concat([pd.DataFrame({"Check": check.name, "Applicant_id": late,
+                                                "Value": as_text(late)}), part], ignore_index=True)
+                self.late_duplicates = []
+            parts.append(part)
+            self.counts[check.name] = self.counts.get(check.name, 0) + len(part)
+            sample = self.samples.setdefault(check.name, [])
+            for value in part["Applicant_id"].dropna().unique()[:SAMPLE_IDS]:
+                if len(sample) < SAMPLE_IDS and value not in sample:
+                    sample.append(value)
+
+        exceptions = pd.concat(parts, ignore_index=True) if parts else _empty_exceptions()
+        exceptions["Check"] = pd.Categorical(exceptions["Check"], categories=[check.name for check in active])
+        self.rows += len(df)
+        self.exceptions += len(exceptions)
+        if self.sink is not None and len(exceptions):
+            self.sink.write(exceptions)
+        return exceptions
+
+    def close(self, commit=True):
+        # A clean run still replaces the old report, with just the header
+        if commit and self.sink.rows == 0:
+            self.sink.write(_empty_exceptions())
+        self.sink.close(commit=commit)
+
+    def summary(self):
+        names = [check.name for check in self.checks if check.name not in (self.skipped or [])]
+        return pd.DataFrame({
+            "Check": names,
+            "Rows": pd.Series([self.counts.get(name, 0) for name in names], dtype="int64"),
+            "Sample": [", ".join(str(x) for x in self.samples.get(name, [])) for name in names],
+        })
+
+def validate(df, mappings, checks=None, computed=None):
+    validator = Validator(mappings, checks, computed=computed)
+    exceptions = validator.add(df)
+    return validator.summary(), exceptions, validator.skipped
+
+def failed_checks(summary, fail_on):
+    # fail_on: None never fails, [] fails on any exception, otherwise only on the named checks
+    if fail_on is None:
+        return []
+    bad = summary[summary["Rows"] > 0]
+    return [name for name in bad["Check"] if not fail_on or name in fail_on]
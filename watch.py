@@ -0,0 +1,230 @@
+import os
+import threading
+import time
+import zipfile
+
+import pandas as pd
+
+from pipeline import (audit_columns, derived_columns, find_file, find_files, finish_run, place_product_name,
+                      prepare_audit, prepare_base, print_join_stats, reconcile, write_exceptions, write_history,
+                      write_lookup_store)
+from audit_join import build_audit_index, merge_audit_index
+from cube import update_cube
+from ingest_cache import read_excel_cached, read_many_cached
+from instrument import RunInstrumentation
+from writers import select_columns, write_output
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+DEFAULT_POLL_INTERVAL = 2.0
+# A file must keep the same size and mtime this long before it is read
+DEFAULT_SETTLE_SECONDS = 2.0
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+def is_complete(path):
+    # An .xlsx still being copied or saved has no zip central directory yet,
+    # and on Windows a workbook Excel is writing cannot be opened at all
+    try:
+        with open(path, "rb"):
+            pass
+    except OSError:
+        return False
+    return zipfile.is_zipfile(path)
+
+# ----------------------------------------------------------------------------
+# Change notification: native events (inotify / ReadDirectoryChangesW) through
+# watchdog when it is installed, otherwise plain polling
+# ----------------------------------------------------------------------------
+class _Wakeup(FileSystemEventHandler):
+    def __init__(self, event):
+        super().__init__()
+        self.event = event
+
+    def on_any_event(self, event):
+        self.event.set()
+
+class FolderWatcher:
+    def __init__(self, folder, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._event = threading.Event()
+        self._observer = None
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(_Wakeup(self._event), folder, recursive=False)
+            self._observer.start()
+            print(f"👀 Watching {folder} for changes")
+        else:
+            print(f"👀 watchdog is not installed - polling {folder} every {poll_interval:g}s")
+
+    def wait(self):
+        # Events only wake the loop early; the timeout lets pending files settle
+        self._event.wait(self.poll_interval)
+        self._event.clear()
+
+    def close(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+
+# ----------------------------------------------------------------------------
+# Warm state: prepared base rows, one prepared frame per audit report, and the
+# Applicant_id audit index, all kept in memory between refreshes
+# ----------------------------------------------------------------------------
+class WarmState:
+    def __init__(self, base_file, mappings, args):
+        self.base_file = base_file
+        self.mappings = mappings
+        self.args = args
+        self.output_path = args.output or base_file
+        self.base_df = None
+        self.reports = {}
+        self.applied = {}
+        self.audit_index = None
+
+    def load_base(self):
+        self.applied[self.base_file] = file_signature(self.base_file)
+        self.base_df = prepare_base(read_excel_cached(self.base_file, rebuild=self.args.rebuild_cache))
+
+    def load_reports(self, paths):
+        for path in paths:
+            self.applied[path] = file_signature(path)
+        frames = read_many_cached(paths, workers=self.args.audit_workers, rebuild=self.args.rebuild_cache)
+        for path, frame in zip(paths, frames):
+            self.reports[path] = prepare_audit(frame)
+        self.rebuild_index()
+
+    def add_report(self, path):
+        self.applied[path] = file_signature(path)
+        audit_df = prepare_audit(read_excel_cached(path))
+        replaced = path in self.reports
+        # Reports stack in file-name order, as in a batch run, whatever order they arrive in
+        appended = not replaced and all(path > loaded for loaded in self.reports)
+        self.reports[path] = audit_df
+        self.reports = dict(sorted(self.reports.items()))
+        if appended and self.audit_index is not None:
+            self.audit_index = merge_audit_index(self.audit_index, audit_df, audit_columns)
+        else:
+            # A rewritten report must not keep its old rows, and one that sorts
+            # before loaded reports changes which duplicate wins
+            self.rebuild_index()
+
+    def drop_report(self, path):
+        self.applied.pop(path, None)
+        self.reports.pop(path, None)
+        self.rebuild_index()
+
+    def rebuild_index(self):
+        if not self.reports:
+            self.audit_index = None
+            return
+        frames = list(self.reports.values())
+        audit_df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        self.audit_index = build_audit_index(audit_df, audit_columns, policy=self.args.duplicate_policy)
+
+    def publish(self, run):
+        if self.audit_index is None:
+            print("⏳ No audit report yet - waiting")
+            return
+        base_df, join_stats = reconcile(self.base_df.copy(), None, self.mappings, self.args.duplicate_policy,
+                                        audit_index=self.audit_index, run=run)
+        print_join_stats(join_stats)
+        if not self.args.no_validate:
+            # Reported on every refresh; --fail-on has no run to fail here
+            write_exceptions(base_df, self.mappings, self.args, run)
+        base_df = place_product_name(base_df)
+        with run.stage("save", len(base_df)):
+            write_output(select_columns(base_df, self.args.output_columns, derived_columns), self.output_path)
+        # Our own write must not look like a new base workbook
+        if os.path.abspath(self.output_path) == os.path.abspath(self.base_file):
+            self.applied[self.base_file] = file_signature(self.base_file)
+        print(f"✅ {os.path.basename(self.output_path)} updated ({len(base_df)} rows)")
+
+        if self.args.lookup_store:
+            # Files are swapped in atomically; a running lookup server keeps its mapped copy
+            write_lookup_store(base_df, self.args.lookup_store, run)
+
+        if not self.args.no_cube:
+            with run.stage("cube", len(base_df)):
+                cube, changed = update_cube(base_df, self.args.cube, sla_days=self.args.sla_days)
+            print(f"📊 TAT cube: {len(cube)} rows, {len(changed)} month(s) refreshed")
+
+        if not self.args.no_history:
+            write_history(base_df, self.args, derived_columns, run)
+
+# ----------------------------------------------------------------------------
+# Service loop: apply files once they have settled, publish, repeat
+# ----------------------------------------------------------------------------
+def _refresh(state, action, run_log, memory):
+    run = RunInstrumentation(memory=memory)
+    try:
+        with run.stage("apply"):
+            action()
+        state.publish(run)
+    except Exception as e:
+        print(f"❌ Refresh failed: {str(e)}")
+    finish_run(run, run_log)
+
+def run_watch(folder, base_file, mappings, args, run_log):
+    state = WarmState(base_file, mappings, args)
+    memory = args.track_memory
+
+    def start():
+        state.load_base()
+        state.load_reports(find_files("Custom_audit_report", folder))
+
+    _refresh(state, start, run_log, memory)
+    watcher = FolderWatcher(folder, args.poll_interval)
+    pending = {}
+    try:
+        while True:
+            watcher.wait()
+            now = time.monotonic()
+            current = {path: file_signature(path) for path in find_files("Custom_audit_report", folder)}
+            base_now = find_file("CKYC BASE DATA", folder)
+            if base_now:
+                current[base_now] = file_signature(base_now)
+
+            ready = []
+            for path, signature in current.items():
+                if signature is None or state.applied.get(path) == signature:
+                    pending.pop(path, None)
+                    continue
+                seen = pending.get(path)
+                if seen is None or seen[0] != signature:
+                    # New or still growing: start (or restart) the settle timer
+                    pending[path] = (signature, now)
+                elif now - seen[1] >= args.settle_seconds and is_complete(path):
+                    ready.append(path)
+                    pending.pop(path)
+            removed = [path for path in state.reports if path not in current]
+            if not ready and not removed:
+                continue
+
+            def apply():
+                for path in removed:
+                    print(f"🗑️ Audit report removed: {os.path.basename(path)}")
+                    state.drop_report(path)
+                for path in ready:
+                    print(f"📥 Applying {os.path.basename(path)}")
+                    if path == base_now:
+                        state.base_file = path
+                        state.load_base()
+                    else:
+                        state.add_report(path)
+
+            _refresh(state, apply, run_log, memory)
+    except KeyboardInterrupt:
+        print("\n👋 Watch mode stopped")
+    finally:
+        watcher.close()
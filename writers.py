@@ -0,0 +1,176 @@
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+OUTPUT_FORMATS = (".xlsx", ".parquet", ".csv")
+
+# ----------------------------------------------------------------------------
+# Column selection: whole workbook, or only the key plus derived columns
+# ----------------------------------------------------------------------------
+def select_columns(df, mode, derived, key="Applicant_id"):
+    if mode == "all":
+        return df
+    if mode == "derived":
+        return df[[key] + [c for c in derived if c in df.columns and c != key]]
+    raise ValueError(f"Unknown output column mode '{mode}', expected 'all' or 'derived'")
+
+# ----------------------------------------------------------------------------
+# Stable column types so repeated writes (chunks) share one schema
+# ----------------------------------------------------------------------------
+def conform_frame(df, dtypes=None):
+    dtypes = dtypes or {}
+    df = df.copy()
+    for col in df.columns:
+        dtype = dtypes.get(col)
+        if dtype == "datetime64[ns]":
+            df[col] = pd.to_datetime(df[col], errors='coerce').astype(dtype)
+        elif dtype is not None:
+            df[col] = df[col].astype(object).where(df[col].notna(), None).astype(dtype)
+        elif isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("string")
+        elif pd.api.types.is_integer_dtype(df[col].dtype):
+            # Excel numbers are doubles; a later chunk with a blank cell must not change the type
+            df[col] = df[col].astype("float64")
+        elif df[col].dtype == object:
+            inferred = pd.api.types.infer_dtype(df[col], skipna=True)
+            if inferred in ("date", "datetime", "datetime64"):
+                df[col] = pd.to_datetime(df[col], errors='coerce').astype("datetime64[ns]")
+            elif inferred in ("integer", "floating", "mixed-integer-float"):
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype("float64")
+            elif inferred != "empty":
+                df[col] = df[col].astype("string")
+    return df
+
+# ----------------------------------------------------------------------------
+# Sinks: every target writes to <path>.tmp and is renamed into place on close,
+# so an interrupted run never leaves a half-written file at <path>
+# ----------------------------------------------------------------------------
+class OutputSink:
+    def __init__(self, path, dtypes=None):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.dtypes = dtypes
+        self.rows = 0
+
+    def write(self, df):
+        self._write(df)
+        self.rows += len(df)
+
+    def _write(self, df):
+        raise NotImplementedError
+
+    def _finish(self):
+        pass
+
+    def close(self, commit=True):
+        try:
+            self._finish()
+        finally:
+            if commit and os.path.exists(self.tmp_path):
+                os.replace(self.tmp_path, self.path)
+            elif os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+class CsvSink(OutputSink):
+    def __init__(self, path, dtypes=None):
+        super().__init__(path, dtypes)
+        self._fh = None
+
+    def _write(self, df):
+        if self._fh is None:
+            self._fh = open(self.tmp_path, "w", encoding="utf-8", newline="")
+        conform_frame(df, self.dtypes).to_csv(self._fh, header=self.rows == 0, index=False)
+
+    def _finish(self):
+        if self._fh is not None:
+            self._fh.close()
+
+class ParquetSink(OutputSink):
+    def __init__(self, path, dtypes=None):
+        if pa is None:
+            raise ValueError("pyarrow is required for Parquet output")
+        super().__init__(path, dtypes)
+        self._writer = None
+        self._schema = None
+
+    def _write(self, df):
+        table = pa.Table.from_pandas(conform_frame(df, self.dtypes), preserve_index=False)
+        if self._writer is None:
+            # All-null columns get a concrete type so later chunks can fill them
+            fields = [pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema]
+            self._schema = pa.schema(fields)
+            self._writer = pq.ParquetWriter(self.tmp_path, self._schema)
+        columns = []
+        for field in self._schema:
+            column = table.column(field.name)
+            if pa.types.is_null(column.type):
+                column = pa.nulls(len(table), type=field.type)
+            elif column.type != field.type:
+                try:
+                    column = column.cast(field.type)
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    raise ValueError(f"Column '{field.name}' changed type between chunks "
+                                     f"({field.type} -> {column.type}); try a larger --chunk-size or CSV output")
+            columns.append(column)
+        self._writer.write_table(pa.Table.from_arrays(columns, schema=self._schema))
+
+    def _finish(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def _is_date_only(series):
+    # datetime64 with every value at midnight: written as Excel dates, not timestamps
+    if not pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return False
+    values = series.dropna()
+    return bool((values == values.dt.normalize()).all())
+
+class XlsxSink(OutputSink):
+    # openpyxl write-only mode streams rows to disk instead of building every cell in memory
+    def __init__(self, path, dtypes=None):
+        super().__init__(path, dtypes)
+        self._workbook = None
+        self._sheet = None
+
+    def _write(self, df):
+        if self._workbook is None:
+            from openpyxl import Workbook
+
+            self._workbook = Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet()
+            self._sheet.append([str(c) for c in df.columns])
+        values = df.astype(object).where(df.notna(), None)
+        for col in df.columns:
+            # Pure dates stay datetime64 through the pipeline and become Excel dates here
+            if _is_date_only(df[col]):
+                values[col] = df[col].dt.date.astype(object).where(df[col].notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            self._sheet.append(row)
+
+    def _finish(self):
+        if self._workbook is not None:
+            self._workbook.save(self.tmp_path)
+
+SINKS = {".xlsx": XlsxSink, ".parquet": ParquetSink, ".csv": CsvSink}
+
+def open_sink(path, dtypes=None):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SINKS:
+        raise ValueError(f"Unsupported output format '{ext}', expected one of {OUTPUT_FORMATS}")
+    return SINKS[ext](path, dtypes)
+
+def write_output(df, path, dtypes=None):
+    sink = open_sink(path, dtypes)
+    try:
+        sink.write(df)
+    except BaseException:
+        sink.close(commit=False)
+        raise
+    sink.close()
+    return sink.rows